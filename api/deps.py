@@ -7,23 +7,26 @@ from core import verify_token
 from jose import JWTError
 security = HTTPBearer()
 
+async def get_user_from_token(token: str) -> User | None:
+    """User for a valid access token, None for a bad, expired or subject-less token or an unknown user"""
+    try:
+        payload = verify_token(token, "access")
+    except JWTError:
+        return None
+    if payload is None:
+        return None
+    username = payload.get("sub")
+    if username is None:
+        return None
+    return await get_user_by_username(username)
+
 async def get_current_user(credentials:HTTPAuthorizationCredentials =Depends(security))->User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = verify_token(credentials.credentials,"access")
-        if payload is None:
-            raise credentials_exception
-        username = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    user = await get_user_by_username(username)
+    user = await get_user_from_token(credentials.credentials)
     if user is None:
         raise credentials_exception
     return user
-
@@ -1,12 +1,14 @@
 from fastapi import APIRouter, HTTPException, Depends, Query, File, UploadFile, Form
 from typing import Optional
-from schemas import MediaCreate, MediaUpdate, MediaResponse, MediaListResponse, MediaDelete
-from services import get_media_by_id, get_media_by_user, update_media, delete_media, upload_media
+from schemas import MediaCreate, MediaUpdate, MediaResponse, MediaListResponse, MediaDelete, DirectUploadSignature, \
+    DirectUploadComplete, MediaStatsResponse, BulkDeleteRequest, BulkDeleteResponse
+from services import get_media_by_id, get_media_by_user, update_media, delete_media, upload_media, temp_workspace, WorkspaceQuotaError, \
+    save_upload, UploadTooLargeError, MEDIA_UPLOAD_TARGETS, create_upload_signature, register_direct_upload, \
+    DirectUploadError, get_media_stats, bulk_delete_media
 from api.deps import get_current_user
 from models.media import MediaType
 import os
-from uuid import uuid4
-from config import TEMP_DIR
+from config import UPLOAD_MAX_BYTES, BULK_DELETE_MAX_ITEMS
 
 router = APIRouter(prefix="/media", tags=["Media"])
 
@@ -18,43 +20,70 @@ async def upload_media_endpoint(
     current_user = Depends(get_current_user)
 ):
     """Upload media file to Cloudinary and save metadata to MongoDB"""
-    # Save uploaded file temporarily
-    temp_file = os.path.join(TEMP_DIR, f"{uuid4()}_{file.filename}")
-    
     try:
-        with open(temp_file, "wb") as f:
-            f.write(await file.read())
-        
-        # Determine folder and resource type based on media type
-        folder_map = {
-            MediaType.IMAGE: ("images", "image"),
-            MediaType.AUDIO: ("audio", "auto"),
-            MediaType.VIDEO: ("videos", "video"),
-            MediaType.TEXT: ("text", "raw")
-        }
-        
-        folder, resource_type = folder_map.get(media_type, ("media", "auto"))
-        
-        # Upload to Cloudinary and save to MongoDB
-        result = await upload_media(
-            file_path=temp_file,
-            user_id=str(current_user.id),
-            folder=folder,
-            resource_type=resource_type,
-            prompt=prompt,
-            metadata={"original_filename": file.filename}
-        )
-        
+        # Save uploaded file temporarily; the workspace is removed on exit
+        async with temp_workspace("upload-", file.size or 0) as workspace:
+            temp_file = workspace.path(file.filename or "upload")
+            await save_upload(file, temp_file, UPLOAD_MAX_BYTES.get(media_type.value))
+
+            # Determine folder and resource type based on media type
+            folder, resource_type = MEDIA_UPLOAD_TARGETS.get(media_type, ("media", "auto"))
+
+            # Upload to Cloudinary and save to MongoDB
+            result = await upload_media(
+                file_path=temp_file,
+                user_id=str(current_user.id),
+                folder=folder,
+                resource_type=resource_type,
+                prompt=prompt,
+                metadata={"original_filename": file.filename}
+            )
+
         # Get the saved media from database
         media = await get_media_by_id(result["id"])
         return MediaResponse(**media)
-        
+
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except WorkspaceQuotaError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload error: {str(e)}")
-    finally:
-        # Clean up temp file
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
+
+@router.post("/upload-signature", response_model=DirectUploadSignature)
+async def upload_signature_endpoint(
+    media_type: MediaType = Form(...),
+    current_user = Depends(get_current_user)
+):
+    """Sign an upload that the client sends straight to Cloudinary, into the user's own folder"""
+    try:
+        return DirectUploadSignature(**create_upload_signature(str(current_user.id), media_type))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Upload signature error: {str(e)}")
+
+@router.post("/upload-complete", response_model=MediaResponse)
+async def upload_complete_endpoint(
+    upload: DirectUploadComplete,
+    current_user = Depends(get_current_user)
+):
+    """Register an asset uploaded with /upload-signature once Cloudinary has stored it"""
+    try:
+        result = await register_direct_upload(
+            str(current_user.id),
+            upload.media_type,
+            upload.public_id,
+            upload.version,
+            upload.signature,
+            prompt=upload.content,
+            metadata=upload.metadata
+        )
+    except DirectUploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Upload registration error: {str(e)}")
+
+    media = await get_media_by_id(result["id"])
+    return MediaResponse(**media)
 
 @router.post("/create", response_model=MediaResponse)
 async def create_media_endpoint(
@@ -66,22 +95,19 @@ async def create_media_endpoint(
         # For text media, we don't need to upload a file
         if media_create.media_type == MediaType.TEXT:
             # Create a text file with the prompt content
-            temp_file = os.path.join(TEMP_DIR, f"{uuid4()}.txt")
-            with open(temp_file, "w", encoding="utf-8") as f:
-                f.write(media_create.content)
-            
-            result = await upload_media(
-                file_path=temp_file,
-                user_id=str(current_user.id),
-                folder="text",
-                resource_type="raw",
-                prompt=media_create.content,
-                metadata=media_create.metadata
-            )
-            
-            # Clean up temp file
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
+            async with temp_workspace("text-") as workspace:
+                temp_file = workspace.path("content.txt", fast=True)
+                with open(temp_file, "w", encoding="utf-8") as f:
+                    f.write(media_create.content)
+
+                result = await upload_media(
+                    file_path=temp_file,
+                    user_id=str(current_user.id),
+                    folder="text",
+                    resource_type="raw",
+                    prompt=media_create.content,
+                    metadata=media_create.metadata
+                )
             
             # Get the saved media from database
             media = await get_media_by_id(result["id"])
@@ -94,6 +120,30 @@ async def create_media_endpoint(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Create media error: {str(e)}")
 
+@router.post("/bulk-delete", response_model=BulkDeleteResponse)
+async def bulk_delete_media_endpoint(
+    request: BulkDeleteRequest,
+    current_user = Depends(get_current_user)
+):
+    """Delete many media items; items that fail are reported per ID without failing the request"""
+    media_ids = list(dict.fromkeys(request.media_ids))
+    if len(media_ids) > BULK_DELETE_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_DELETE_MAX_ITEMS} media items per request")
+    try:
+        results = await bulk_delete_media(media_ids, str(current_user.id))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Bulk delete error: {str(e)}")
+    deleted = sum(1 for item in results if item["success"])
+    return BulkDeleteResponse(deleted=deleted, failed=len(results) - deleted, results=results)
+
+@router.get("/stats", response_model=MediaStatsResponse)
+async def get_media_stats_endpoint(current_user = Depends(get_current_user)):
+    """Media counts per type, total bytes and duration for the current user's dashboard"""
+    try:
+        return MediaStatsResponse(**await get_media_stats(str(current_user.id)))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Media stats error: {str(e)}")
+
 @router.get("/{media_id}", response_model=MediaResponse)
 async def get_media(
     media_id: str,
@@ -112,13 +162,18 @@ async def get_media(
 
 @router.get("/", response_model=MediaListResponse)
 async def get_user_media(
-    page: int = Query(1, ge=1, description="Page number"),
+    page: int = Query(1, ge=1, description="Page number (ignored when cursor is given)"),
     size: int = Query(10, ge=1, le=100, description="Page size"),
     media_type: Optional[MediaType] = Query(None, description="Filter by media type"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include_total: bool = Query(True, description="Count all matching media (one extra query)"),
     current_user = Depends(get_current_user)
 ):
-    """Get current user's media with pagination and optional filtering"""
-    result = await get_media_by_user(str(current_user.id), page, size, media_type)
+    """Get current user's media, newest first, paged by cursor or page number, with optional filtering"""
+    try:
+        result = await get_media_by_user(str(current_user.id), page, size, media_type, cursor, include_total)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     media_responses = [MediaResponse(**media) for media in result["media"]]
     
@@ -126,7 +181,9 @@ async def get_user_media(
         media=media_responses,
         total=result["total"],
         page=result["page"],
-        size=result["size"]
+        size=result["size"],
+        next_cursor=result["next_cursor"],
+        has_more=result["has_more"]
     )
 
 @router.put("/{media_id}", response_model=MediaResponse)
@@ -1,126 +1,456 @@
-from fastapi import APIRouter, File, UploadFile, Form, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Depends, Request, WebSocket, WebSocketDisconnect, Query
+from fastapi.responses import FileResponse, StreamingResponse, Response
+from starlette.background import BackgroundTask
 import os
-from uuid import uuid4
+import json
+import time
+import asyncio
+import zipfile
 from typing import Optional
 import tempfile
 # from config import OUTPUT_DIR
-from config import TEMP_DIR
-from services import generate_text, generate_speech, generate_image, transcribe_audio, convert_to_srt, create_video, add_subtitles, upload_media
-from typing import Literal
+from services import generate_text_cached, get_text_cache_stats, stream_text_async, generate_speech_bytes, split_text_for_tts, stream_speech_chunks, get_tts_cache_stats, get_single_flight_stats, generate_image_cached, get_image_cache_stats, transcode_image, detect_image_format, IMAGE_FORMATS, generate_images_batch, transcribe_audio_async, convert_to_srt, get_subtitle_media_type, render_video_async, render_slideshow_async, remove_temp_files, open_workspace, WorkspaceQuotaError, get_workspace_stats, save_upload, UploadTooLargeError, get_ingest_stats, get_upload_stats, new_render_job_dir, remove_render_job_dir, enqueue_render_job, get_render_job, TERMINAL_JOB_STATUSES, get_ffmpeg_stats, upload_media
+from typing import Literal, List
+from api.deps import get_current_user, get_user_from_token
+from schemas import BatchImageItem, BatchImageResponse, RenderJobResponse
+from config import IMAGE_BATCH_MAX_PROMPTS, SLIDESHOW_MAX_SCENES, UPLOAD_MAX_BYTES
 
 router = APIRouter(prefix="/media", tags=["Media Generation"])
 
 @router.post("/generate-text")
-async def generate_text_endpoint(model: Literal["deepseek", "gemini"] = Form(...), prompt: str = Form(...), max_length: int = Form(100)):
+async def generate_text_endpoint(model: Literal["deepseek", "gemini"] = Form(...), prompt: str = Form(...), max_length: int = Form(100), stream: bool = Form(False), use_cache: bool = Form(True)):
     """Generate text from a prompt"""
+    if stream:
+        return StreamingResponse(
+            _text_event_stream(model, prompt, max_length),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
     try:
-        generated_text = generate_text(model, prompt, max_length)
+        generated_text = await generate_text_cached(model, prompt, max_length, use_cache)
         return {"text": generated_text}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Text generation error: {str(e)}")
 
+@router.get("/generate-text/cache-stats")
+async def text_cache_stats_endpoint():
+    """Hit/miss counters for the text generation cache"""
+    return get_text_cache_stats()
+
+async def _text_event_stream(model, prompt, max_length):
+    """Relay generated text chunks as Server-Sent Events, ending with token timing stats"""
+    start_time = time.perf_counter()
+    first_token_time = None
+    chunk_count = 0
+    char_count = 0
+    usage = {}
+    try:
+        async for chunk in stream_text_async(model, prompt, max_length, usage=usage):
+            if first_token_time is None:
+                first_token_time = time.perf_counter() - start_time
+            chunk_count += 1
+            char_count += len(chunk)
+            yield f"data: {json.dumps({'text': chunk})}\n\n"
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps({'detail': f'Text generation error: {str(e)}'})}\n\n"
+        return
+    total_time = time.perf_counter() - start_time
+    completion_tokens = usage.get("completion_tokens")
+    # Decode rate: tokens after the first one, over the time spent streaming them
+    generation_time = total_time - first_token_time if first_token_time is not None else None
+    stats = {
+        "time_to_first_token": round(first_token_time, 4) if first_token_time is not None else None,
+        "total_time": round(total_time, 4),
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "completion_tokens": completion_tokens,
+        "tokens_per_second": round((completion_tokens - 1) / generation_time, 2)
+                             if completion_tokens and completion_tokens > 1 and generation_time else None,
+        "chunks": chunk_count,
+        "characters": char_count
+    }
+    yield f"event: done\ndata: {json.dumps(stats)}\n\n"
+
 @router.post("/tts")
 async def text_to_speech(text: str = Form(...), voice: str = Form("Fritz-PlayAI")):
     """Convert text to speech"""
-    output_file = os.path.join(TEMP_DIR, f"{uuid4()}.wav")
+    chunks = split_text_for_tts(text)
+    if len(chunks) > 1:
+        # Long text: synthesize sentence chunks concurrently and stream them in order
+        stream = stream_speech_chunks(chunks, voice)
+        try:
+            first_part = await stream.__anext__()
+        except Exception as e:
+            await stream.aclose()
+            raise HTTPException(status_code=500, detail=f"TTS error: {str(e)}")
+
+        async def audio_stream():
+            yield first_part
+            async for part in stream:
+                yield part
+
+        return StreamingResponse(
+            audio_stream(),
+            media_type="audio/wav",
+            headers={"Content-Disposition": 'attachment; filename="speech.wav"'}
+        )
     try:
-        result_file = generate_speech(text, output_file, voice)
-        return FileResponse(result_file, media_type="audio/wav", filename="speech.wav")
+        audio_bytes = await generate_speech_bytes(text, voice)
+        return Response(
+            content=audio_bytes,
+            media_type="audio/wav",
+            headers={"Content-Disposition": 'attachment; filename="speech.wav"'}
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"TTS error: {str(e)}")
-    finally:
-        # Clean up temporary file
-        if os.path.exists(output_file) and output_file.startswith(TEMP_DIR):
-            os.remove(output_file)
+
+@router.get("/tts/cache-stats")
+async def tts_cache_stats_endpoint():
+    """Hit/miss counters and disk usage for the TTS phrase cache"""
+    return get_tts_cache_stats()
 
 @router.post("/generate-image")
-async def generate_image_endpoint(model: Literal["flux", "gemini"] = Form(...),prompt: str = Form(...)):
+async def generate_image_endpoint(
+    model: Literal["flux", "gemini"] = Form(...),
+    prompt: str = Form(...),
+    use_cache: bool = Form(True),
+    output_format: Optional[Literal["png", "jpeg", "webp"]] = Form(None, description="Transcode to this format; default keeps the provider's format"),
+    output_width: Optional[int] = Form(None, ge=16, le=4096, description="Resize to this width (requires output_height)"),
+    output_height: Optional[int] = Form(None, ge=16, le=4096, description="Resize to this height (requires output_width)")
+):
     """Generate image from text prompt"""
-    output_file = os.path.join(TEMP_DIR, f"{uuid4()}.png")
+    if (output_width is None) != (output_height is None):
+        raise HTTPException(status_code=400, detail="output_width and output_height must be given together")
     try:
-        result_file = generate_image(model, prompt, output_file)
-        return FileResponse(result_file, media_type="image/png", filename="image.png")
+        image_data, cache_hit = await generate_image_cached(model, prompt, use_cache=use_cache)
+        size = (output_width, output_height) if output_width else None
+        if output_format or size:
+            image_data = await asyncio.to_thread(transcode_image, image_data, output_format, size)
+        image_format = detect_image_format(image_data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Image generation error: {str(e)}")
+    return Response(
+        content=image_data,
+        media_type=IMAGE_FORMATS[image_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="image.{image_format}"',
+            "X-Cache": "HIT" if cache_hit else "MISS"
+        }
+    )
+
+@router.post("/generate-images")
+async def generate_images_endpoint(
+    model: Literal["flux", "gemini"] = Form(...),
+    prompts: List[str] = Form(...),
+    response_mode: Literal["zip", "upload"] = Form("zip"),
+    current_user = Depends(get_current_user)
+):
+    """Generate one image per prompt and return a ZIP or a list of uploaded media"""
+    prompts = [p for p in prompts if p.strip()]
+    if not prompts:
+        raise HTTPException(status_code=400, detail="At least one prompt is required")
+    if len(prompts) > IMAGE_BATCH_MAX_PROMPTS:
+        raise HTTPException(status_code=400, detail=f"At most {IMAGE_BATCH_MAX_PROMPTS} prompts per request")
+    workspace = await _open_request_workspace("images-")
+    try:
+        results = await generate_images_batch(model, prompts, workspace=workspace)
+        if not any("file" in r for r in results):
+            raise Exception(results[0]["error"])
+        if response_mode == "zip":
+            zip_file = workspace.path("images.zip")
+            await asyncio.to_thread(_write_image_zip, results, zip_file)
+    except Exception as e:
+        await workspace.close()
+        raise HTTPException(status_code=500, detail=f"Image generation error: {str(e)}")
+
+    if response_mode == "zip":
+        return FileResponse(
+            zip_file,
+            media_type="application/zip",
+            filename="images.zip",
+            background=BackgroundTask(workspace.close)
+        )
+
+    async def upload(result):
+        if "file" not in result:
+            return BatchImageItem(prompt=result["prompt"], error=result["error"])
+        try:
+            uploaded = await upload_media(
+                file_path=result["file"],
+                user_id=str(current_user.id),
+                folder="images",
+                resource_type="image",
+                prompt=result["prompt"],
+                metadata={"model": model}
+            )
+            return BatchImageItem(prompt=result["prompt"], media_id=uploaded["id"], url=uploaded["url"])
+        except Exception as e:
+            return BatchImageItem(prompt=result["prompt"], error=str(e))
+
+    try:
+        items = await asyncio.gather(*(upload(r) for r in results))
     finally:
-        # Clean up temporary file
-        if os.path.exists(output_file) and output_file.startswith(TEMP_DIR):
-            os.remove(output_file)
+        await workspace.close()
+    failed = sum(1 for item in items if item.error)
+    return BatchImageResponse(images=items, succeeded=len(items) - failed, failed=failed)
+
+def _write_image_zip(results, zip_file):
+    # Generated images are already compressed, so store them as-is
+    with zipfile.ZipFile(zip_file, "w", compression=zipfile.ZIP_STORED) as zf:
+        for i, result in enumerate(results, 1):
+            if "file" in result:
+                zf.write(result["file"], arcname=f"image_{i:02d}{os.path.splitext(result['file'])[1]}")
+        errors = [{"index": i, "prompt": r["prompt"], "error": r["error"]} for i, r in enumerate(results, 1) if "error" in r]
+        if errors:
+            zf.writestr("errors.json", json.dumps(errors, ensure_ascii=False, indent=2))
+
+@router.get("/generate-image/cache-stats")
+async def image_cache_stats_endpoint():
+    """Hit/miss counters and disk usage for the image cache"""
+    return get_image_cache_stats()
+
+@router.get("/coalescing-stats")
+async def coalescing_stats_endpoint():
+    """How many identical in-flight generation requests were collapsed"""
+    return get_single_flight_stats()
+
+@router.get("/ffmpeg-stats")
+async def ffmpeg_stats_endpoint():
+    """Running, queued and finished ffmpeg jobs in this worker"""
+    return get_ffmpeg_stats()
+
+@router.get("/workspace-stats")
+async def workspace_stats_endpoint():
+    """Temp disk quota usage, open workspaces and janitor counters in this worker"""
+    return get_workspace_stats()
+
+async def _open_request_workspace(prefix, reserve_bytes=0):
+    """Open a temp workspace for one request; a full quota is reported as 503 so clients retry later"""
+    try:
+        return await open_workspace(prefix, reserve_bytes)
+    except WorkspaceQuotaError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+def _upload_size(*files):
+    return sum(f.size or 0 for f in files)
+
+async def _save_request_uploads(uploads):
+    """Stream (UploadFile, path, media type) uploads to disk in fixed-size chunks, checking per-type limits"""
+    try:
+        for upload, path, media_type in uploads:
+            await save_upload(upload, path, UPLOAD_MAX_BYTES[media_type])
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Upload error: {str(e)}")
+
+@router.get("/ingest-stats")
+async def ingest_stats_endpoint():
+    """Bytes, throughput and peak buffer of streamed uploads in this worker"""
+    return get_ingest_stats()
+
+@router.get("/upload-stats")
+async def upload_stats_endpoint():
+    """Cloudinary upload throughput, chunked uploads and chunk retries in this worker"""
+    return get_upload_stats()
 
 @router.post("/transcribe")
-async def transcribe_audio_endpoint(file: UploadFile = File(...), create_srt: bool = Form(False)):
+async def transcribe_audio_endpoint(file: UploadFile = File(...), create_srt: bool = Form(False), long_audio: Optional[bool] = Form(None), use_cache: bool = Form(True), subtitle_format: Literal["srt", "vtt", "ass"] = Form("srt")):
     """Transcribe audio to text"""
-    # Save uploaded file temporarily
-    temp_file = os.path.join(TEMP_DIR, f"{uuid4()}.wav")
-    with open(temp_file, "wb") as f:
-        f.write(await file.read())
-    
+    # Room for the upload plus the FLAC pieces of a long-audio split
+    workspace = await _open_request_workspace("transcribe-", 2 * _upload_size(file))
+    temp_file = workspace.path("audio.wav")
+    try:
+        await _save_request_uploads([(file, temp_file, "audio")])
+    except HTTPException:
+        await workspace.close()
+        raise
+
     try:
         if create_srt:
-            srt_file = os.path.join(TEMP_DIR, f"{uuid4()}.srt")
-            transcription = transcribe_audio(temp_file, srt_file)
-            return FileResponse(srt_file, media_type="text/plain", filename="transcription.srt")
-            
+            srt_file = workspace.path(f"transcription.{subtitle_format}", fast=True)
+            transcription = await transcribe_audio_async(temp_file, srt_file, long_audio=long_audio, use_cache=use_cache, subtitle_format=subtitle_format, workspace=workspace)
         else:
-            transcription = transcribe_audio(temp_file)
-            return {"text": transcription.text}
+            transcription = await transcribe_audio_async(temp_file, long_audio=long_audio, use_cache=use_cache, workspace=workspace)
     except Exception as e:
+        await workspace.close()
         raise HTTPException(status_code=500, detail=f"Transcription error: {str(e)}")
-    finally:
-        # Clean up temp file
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
+
+    if create_srt:
+        return FileResponse(
+            srt_file,
+            media_type=get_subtitle_media_type(subtitle_format),
+            filename=f"transcription.{subtitle_format}",
+            background=BackgroundTask(workspace.close)
+        )
+    await workspace.close()
+    return {"text": transcription.text}
 
 @router.post("/create-video")
 async def create_video_endpoint(
+    request: Request,
     image: UploadFile = File(...),
     audio: UploadFile = File(...),
-    is_add_subtitles: bool = Form(False)
+    is_add_subtitles: bool = Form(False),
+    subtitle_mode: Literal["burn", "mov_text", "webvtt"] = Form("burn")
 ):
-    """Create video from image and audio"""
-    # Create temp files with specific file extensions
-    temp_image = os.path.join(TEMP_DIR, f"{uuid4()}.png")
-    temp_audio = os.path.join(TEMP_DIR, f"{uuid4()}.wav")
-    temp_files = [temp_image, temp_audio]
-    
-    try:
-        # Save uploaded files
-        with open(temp_image, "wb") as f:
-            f.write(await image.read())
-        with open(temp_audio, "wb") as f:
-            f.write(await audio.read())
-        
-        # Create video
-        output_video = os.path.join(TEMP_DIR, f"{uuid4()}.mp4")
-        temp_files.append(output_video)
-        result_file = create_video(temp_image, temp_audio, output_video)
-        
-        if result_file is None:
-            raise HTTPException(status_code=500, detail="Failed to create video")
-        
-        if is_add_subtitles:
-            # Create SRT file
-            srt_file = os.path.join(TEMP_DIR, f"{uuid4()}.srt")
-            temp_files.append(srt_file)
-            transcription = transcribe_audio(temp_audio, srt_file)
-            
-            # Add subtitles
-            output_with_subs = os.path.join(TEMP_DIR, f"{uuid4()}_subtitled.mp4")
-            temp_files.append(output_with_subs)
-            
-            result_file = add_subtitles(output_video, srt_file, output_with_subs)
-            if result_file is None:
-                raise HTTPException(status_code=500, detail="Failed to add subtitles")
-
-        return FileResponse(result_file, media_type="video/mp4", filename="output.mp4")
+    """
+    Create video from image and audio
+
+    subtitle_mode: "burn" renders subtitles into the picture; "mov_text" (MP4) and
+    "webvtt" (MKV) mux them as a selectable track without re-encoding the video
+    """
+    # Room for the uploads plus a rendered video of similar size
+    workspace = await _open_request_workspace("video-", 2 * _upload_size(image, audio))
+    temp_image = workspace.path("image.png")
+    temp_audio = workspace.path("audio.wav")
+
+    def log_progress(progress):
+        if progress["percent"] is not None:
+            print(f"Rendering video: {progress['percent']}% (speed {progress['speed']})")
+
+    try:
+        await _save_request_uploads([(image, temp_image, "image"), (audio, temp_audio, "audio")])
+    except HTTPException:
+        await workspace.close()
+        raise
+
+    try:
+        result_file, _ = await render_video_async(
+            temp_image, temp_audio, is_add_subtitles, subtitle_mode,
+            on_progress=log_progress, is_disconnected=request.is_disconnected, workspace=workspace
+        )
     except Exception as e:
+        await workspace.close()
         raise HTTPException(status_code=500, detail=f"Video creation error: {str(e)}")
-    finally:
-        # Clean up all temp files 
-        for f in temp_files:
-            if os.path.exists(f):
-                try:
-                    os.remove(f)
-                except Exception as e:
-                    print(f"Error deleting temporary file {f}: {e}")
\ No newline at end of file
+
+    # Remove the workspace once the response has been sent
+    is_mkv = result_file.endswith(".mkv")
+    return FileResponse(
+        result_file,
+        media_type="video/x-matroska" if is_mkv else "video/mp4",
+        filename="output.mkv" if is_mkv else "output.mp4",
+        background=BackgroundTask(workspace.close)
+    )
+
+
+@router.post("/create-slideshow")
+async def create_slideshow_endpoint(
+    request: Request,
+    images: List[UploadFile] = File(..., description="One image per scene, in order"),
+    audios: List[UploadFile] = File(..., description="One narration per scene, in order"),
+    width: int = Form(1280, ge=16, le=3840),
+    height: int = Form(720, ge=16, le=2160),
+    is_add_subtitles: bool = Form(False)
+):
+    """Create a multi-scene video; scenes are encoded in parallel and joined without re-encoding"""
+    if len(images) != len(audios):
+        raise HTTPException(status_code=400, detail="Each scene needs exactly one image and one audio file")
+    if not images or len(images) > SLIDESHOW_MAX_SCENES:
+        raise HTTPException(status_code=400, detail=f"A slideshow needs 1 to {SLIDESHOW_MAX_SCENES} scenes")
+
+    # Room for the uploads, the encoded segments and the joined video
+    workspace = await _open_request_workspace("slideshow-", 3 * _upload_size(*images, *audios))
+    scenes = [
+        (workspace.path(f"scene_{index:03d}.png"), workspace.path(f"scene_{index:03d}.wav"))
+        for index in range(len(images))
+    ]
+    uploads = []
+    for (image, audio), (temp_image, temp_audio) in zip(zip(images, audios), scenes):
+        uploads.extend([(image, temp_image, "image"), (audio, temp_audio, "audio")])
+    try:
+        await _save_request_uploads(uploads)
+    except HTTPException:
+        await workspace.close()
+        raise
+
+    try:
+        # libx264 needs even dimensions
+        result_file, _ = await render_slideshow_async(
+            scenes, width - width % 2, height - height % 2, is_add_subtitles,
+            is_disconnected=request.is_disconnected, workspace=workspace
+        )
+    except Exception as e:
+        await workspace.close()
+        raise HTTPException(status_code=500, detail=f"Slideshow creation error: {str(e)}")
+
+    return FileResponse(
+        result_file,
+        media_type="video/mp4",
+        filename="slideshow.mp4",
+        background=BackgroundTask(workspace.close)
+    )
+
+@router.post("/create-video/jobs", response_model=RenderJobResponse, status_code=202)
+async def create_video_job_endpoint(
+    image: UploadFile = File(...),
+    audio: UploadFile = File(...),
+    is_add_subtitles: bool = Form(False),
+    subtitle_mode: Literal["burn", "mov_text", "webvtt"] = Form("burn"),
+    current_user = Depends(get_current_user)
+):
+    """Queue a video render; poll the job or open its WebSocket for status and the final URL"""
+    job_id, job_dir = new_render_job_dir()
+    image_path = os.path.join(job_dir, "image.png")
+    audio_path = os.path.join(job_dir, "audio.wav")
+    try:
+        await _save_request_uploads([(image, image_path, "image"), (audio, audio_path, "audio")])
+    except HTTPException:
+        remove_render_job_dir(job_id)
+        raise
+
+    try:
+        job = await enqueue_render_job(
+            job_id, str(current_user.id), image_path, audio_path, is_add_subtitles, subtitle_mode
+        )
+    except Exception as e:
+        remove_render_job_dir(job_id)
+        raise HTTPException(status_code=500, detail=f"Failed to queue video render: {str(e)}")
+    return _render_job_response(job)
+
+@router.get("/create-video/jobs/{job_id}", response_model=RenderJobResponse)
+async def get_video_job_endpoint(job_id: str, current_user = Depends(get_current_user)):
+    """Get the status of a queued video render"""
+    job = await get_render_job(job_id, str(current_user.id))
+    if not job:
+        raise HTTPException(status_code=404, detail="Render job not found")
+    return _render_job_response(job)
+
+@router.websocket("/create-video/jobs/{job_id}/ws")
+async def video_job_websocket(websocket: WebSocket, job_id: str, token: str = Query(...)):
+    """Push render job status updates until the job completes or fails"""
+    user = await get_user_from_token(token)
+    if user is None:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    last_sent = None
+    try:
+        while True:
+            job = await get_render_job(job_id, str(user.id))
+            if not job:
+                await websocket.send_json({"detail": "Render job not found"})
+                break
+            status = _render_job_response(job).model_dump(mode="json")
+            if status != last_sent:
+                await websocket.send_json(status)
+                last_sent = status
+            if job["status"] in TERMINAL_JOB_STATUSES:
+                break
+            await asyncio.sleep(1)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+def _render_job_response(job) -> RenderJobResponse:
+    result = job.get("result") or {}
+    return RenderJobResponse(
+        id=str(job["_id"]),
+        status=job["status"],
+        progress=job.get("progress"),
+        attempts=job.get("attempts", 0),
+        media_id=result.get("media_id"),
+        url=result.get("url"),
+        error=job.get("error"),
+        created_at=job["created_at"],
+        updated_at=job["updated_at"]
+    )
@@ -1,3 +1,4 @@
 from .app_config import *
 from .cloudinary_config import cloudinary_config
-from .mongodb_config import get_database, media_collection, user_collection,test_connection
\ No newline at end of file
+from .mongodb_config import get_database, media_collection, user_collection,test_connection, text_cache_collection, transcription_cache_collection, render_job_collection, media_stats_collection
+from .mongodb_indexes import ensure_indexes, verify_query_plans, QueryPlanError
@@ -29,4 +29,107 @@ GOOGLE_REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI")
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 FACEBOOK_APP_ID =os.getenv("FACEBOOK_APP_ID")
 FACEBOOK_APP_SECRET=os.getenv("FACEBOOK_APP_SECRET")
-FACEBOOK_REDIRECT_URI=os.getenv("FACEBOOK_REDIRECT_URI","http://localhost:3000")
\ No newline at end of file
+FACEBOOK_REDIRECT_URI=os.getenv("FACEBOOK_REDIRECT_URI","http://localhost:3000")
+
+# Provider clients
+PROVIDER_MAX_CONNECTIONS = int(os.getenv("PROVIDER_MAX_CONNECTIONS", "100"))
+PROVIDER_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("PROVIDER_MAX_KEEPALIVE_CONNECTIONS", "20"))
+PROVIDER_KEEPALIVE_EXPIRY = float(os.getenv("PROVIDER_KEEPALIVE_EXPIRY", "60"))
+PROVIDER_TIMEOUT = float(os.getenv("PROVIDER_TIMEOUT", "120"))
+
+# Text generation cache
+TEXT_CACHE_TTL_SECONDS = int(os.getenv("TEXT_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+TEXT_CACHE_MAX_ENTRIES = int(os.getenv("TEXT_CACHE_MAX_ENTRIES", "1000"))
+
+# Generated image cache
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(TEMP_DIR, "image_cache"))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# Batch image generation
+IMAGE_BATCH_MAX_PROMPTS = int(os.getenv("IMAGE_BATCH_MAX_PROMPTS", "20"))
+IMAGE_BATCH_MAX_N = int(os.getenv("IMAGE_BATCH_MAX_N", "4"))  # Together's per-request image cap
+IMAGE_BATCH_CONCURRENCY = {
+    "flux": int(os.getenv("IMAGE_BATCH_CONCURRENCY_FLUX", "4")),
+    "gemini": int(os.getenv("IMAGE_BATCH_CONCURRENCY_GEMINI", "4")),
+}
+
+# Chunked TTS
+TTS_CHUNK_MAX_CHARS = int(os.getenv("TTS_CHUNK_MAX_CHARS", "400"))
+TTS_CHUNK_CONCURRENCY = int(os.getenv("TTS_CHUNK_CONCURRENCY", "4"))
+
+# TTS phrase cache
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(TEMP_DIR, "tts_cache"))
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Long-audio transcription
+TRANSCRIBE_LONG_AUDIO_SECONDS = float(os.getenv("TRANSCRIBE_LONG_AUDIO_SECONDS", "900"))
+TRANSCRIBE_CHUNK_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_SECONDS", "600"))
+TRANSCRIBE_CHUNK_OVERLAP_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_OVERLAP_SECONDS", "2"))
+TRANSCRIBE_CONCURRENCY = int(os.getenv("TRANSCRIBE_CONCURRENCY", "4"))
+
+# Transcription cache
+TRANSCRIPTION_CACHE_TTL_SECONDS = int(os.getenv("TRANSCRIPTION_CACHE_TTL_SECONDS", str(30 * 24 * 60 * 60)))
+
+# FFmpeg jobs
+FFMPEG_MAX_CONCURRENCY = int(os.getenv("FFMPEG_MAX_CONCURRENCY", str(os.cpu_count() or 1)))
+FFMPEG_TIMEOUT_SECONDS = float(os.getenv("FFMPEG_TIMEOUT_SECONDS", "1800"))
+
+# Background render jobs
+RENDER_JOB_DIR = os.getenv("RENDER_JOB_DIR", os.path.join(TEMP_DIR, "render_jobs"))
+RENDER_JOB_LEASE_SECONDS = int(os.getenv("RENDER_JOB_LEASE_SECONDS", "120"))
+RENDER_JOB_MAX_ATTEMPTS = int(os.getenv("RENDER_JOB_MAX_ATTEMPTS", "3"))
+RENDER_WORKER_PROCESSES = int(os.getenv("RENDER_WORKER_PROCESSES", "1"))  # per `python render_worker.py`
+# Also start RENDER_WORKER_PROCESSES workers inside the API process; only for single-process
+# deployments, since every uvicorn worker would start its own set
+RENDER_WORKERS_IN_API = os.getenv("RENDER_WORKERS_IN_API", "false").lower() in ("1", "true", "yes")
+RENDER_WORKER_POLL_SECONDS = float(os.getenv("RENDER_WORKER_POLL_SECONDS", "2"))
+RENDER_JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("RENDER_JOB_RETRY_BACKOFF_SECONDS", "30"))  # doubled per attempt
+RENDER_WORKER_STOP_SECONDS = float(os.getenv("RENDER_WORKER_STOP_SECONDS", "60"))  # grace before workers are killed
+
+# Slideshow rendering
+SLIDESHOW_MAX_SCENES = int(os.getenv("SLIDESHOW_MAX_SCENES", "50"))
+
+# Temp workspaces
+WORKSPACE_DIR = os.getenv("WORKSPACE_DIR", os.path.join(TEMP_DIR, "work"))
+WORKSPACE_FAST_DIR = os.getenv("WORKSPACE_FAST_DIR")  # e.g. a tmpfs mount such as /dev/shm/media-api
+# Per process: each API and render worker process enforces its own quota, so size it as the host budget
+# divided by the number of processes
+WORKSPACE_QUOTA_BYTES = int(os.getenv("WORKSPACE_QUOTA_BYTES", str(10 * 1024 * 1024 * 1024)))
+WORKSPACE_QUOTA_WAIT_SECONDS = float(os.getenv("WORKSPACE_QUOTA_WAIT_SECONDS", "30"))
+WORKSPACE_MAX_AGE_SECONDS = int(os.getenv("WORKSPACE_MAX_AGE_SECONDS", str(6 * 60 * 60)))
+WORKSPACE_JANITOR_INTERVAL_SECONDS = int(os.getenv("WORKSPACE_JANITOR_INTERVAL_SECONDS", "900"))
+
+# Upload ingestion
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+UPLOAD_MAX_BYTES = {
+    "image": int(os.getenv("UPLOAD_MAX_IMAGE_BYTES", str(25 * 1024 * 1024))),
+    "audio": int(os.getenv("UPLOAD_MAX_AUDIO_BYTES", str(500 * 1024 * 1024))),
+    "video": int(os.getenv("UPLOAD_MAX_VIDEO_BYTES", str(2 * 1024 * 1024 * 1024))),
+    "text": int(os.getenv("UPLOAD_MAX_TEXT_BYTES", str(10 * 1024 * 1024))),
+}
+_UPLOAD_FORM_OVERHEAD_BYTES = 64 * 1024  # multipart boundaries and small form fields
+# Content-Length ceiling per route, checked before the multipart body is read
+UPLOAD_REQUEST_LIMITS = {
+    "/media/upload": max(UPLOAD_MAX_BYTES.values()) + _UPLOAD_FORM_OVERHEAD_BYTES,
+    "/media/transcribe": UPLOAD_MAX_BYTES["audio"] + _UPLOAD_FORM_OVERHEAD_BYTES,
+    "/media/create-video": UPLOAD_MAX_BYTES["image"] + UPLOAD_MAX_BYTES["audio"] + _UPLOAD_FORM_OVERHEAD_BYTES,
+    "/media/create-video/jobs": UPLOAD_MAX_BYTES["image"] + UPLOAD_MAX_BYTES["audio"] + _UPLOAD_FORM_OVERHEAD_BYTES,
+    "/media/create-slideshow": SLIDESHOW_MAX_SCENES * (UPLOAD_MAX_BYTES["image"] + UPLOAD_MAX_BYTES["audio"])
+                               + _UPLOAD_FORM_OVERHEAD_BYTES,
+}
+
+# Cloudinary uploads
+CLOUDINARY_UPLOAD_CONCURRENCY = int(os.getenv("CLOUDINARY_UPLOAD_CONCURRENCY", "4"))
+CLOUDINARY_LARGE_UPLOAD_BYTES = int(os.getenv("CLOUDINARY_LARGE_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+CLOUDINARY_CHUNK_BYTES = max(5 * 1024 * 1024, int(os.getenv("CLOUDINARY_CHUNK_BYTES", str(20 * 1024 * 1024))))  # Cloudinary minimum is 5 MB
+CLOUDINARY_CHUNK_RETRIES = int(os.getenv("CLOUDINARY_CHUNK_RETRIES", "3"))
+CLOUDINARY_RETRY_BACKOFF_SECONDS = float(os.getenv("CLOUDINARY_RETRY_BACKOFF_SECONDS", "1"))
+
+# MongoDB query plan check at startup: "warn" logs collection scans, "fail" refuses to start, "off" skips it
+MONGODB_QUERY_PLAN_CHECK = os.getenv("MONGODB_QUERY_PLAN_CHECK", "warn")
+
+# Per-user media counters: rebuilt from the media collection on this interval (0 disables)
+MEDIA_STATS_RECONCILE_INTERVAL_SECONDS = int(os.getenv("MEDIA_STATS_RECONCILE_INTERVAL_SECONDS", str(24 * 60 * 60)))
+
+# Bulk media delete: most media IDs accepted in one request
+BULK_DELETE_MAX_ITEMS = int(os.getenv("BULK_DELETE_MAX_ITEMS", "1000"))
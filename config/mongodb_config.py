@@ -35,4 +35,20 @@ def media_collection():
 def user_collection():
     """Get media collection"""
     db = get_database()
-    return db["users"]
\ No newline at end of file
+    return db["users"]
+def text_cache_collection():
+    """Get text generation cache collection"""
+    db = get_database()
+    return db["text_cache"]
+def transcription_cache_collection():
+    """Get transcription cache collection"""
+    db = get_database()
+    return db["transcription_cache"]
+def render_job_collection():
+    """Get background render job collection"""
+    db = get_database()
+    return db["render_jobs"]
+def media_stats_collection():
+    """Get per-user media counters collection"""
+    db = get_database()
+    return db["media_stats"]
\ No newline at end of file
@@ -0,0 +1,128 @@
+import asyncio
+import sys
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from .mongodb_config import get_database
+
+# Declarative index definitions, applied idempotently at startup by ensure_indexes().
+# Names are left to MongoDB so indexes created by earlier versions are recognised as the same index.
+INDEXES = {
+    "media": [
+        # get_media_by_user: filter user_id (+ media_type), newest first; _id is the keyset tiebreaker
+        IndexModel([("user_id", ASCENDING), ("media_type", ASCENDING),
+                    ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("public_id", ASCENDING)]),
+    ],
+    "users": [
+        IndexModel([("username", ASCENDING)], unique=True),
+        # email is optional, so only string values have to be unique
+        IndexModel([("email", ASCENDING)], unique=True,
+                   partialFilterExpression={"email": {"$type": "string"}}),
+    ],
+    "text_cache": [
+        # TTL: MongoDB expires cached generations at expires_at
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "transcription_cache": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "render_jobs": [
+        # Workers claim the oldest available job
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("lease_expires_at", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+}
+
+class QueryPlanError(Exception):
+    """A hot query is answered by a collection scan"""
+
+async def ensure_indexes(indexes=INDEXES) -> bool:
+    """Create every declared index; existing identical indexes are left as they are"""
+    db = get_database()
+    ok = True
+    for collection_name, models in indexes.items():
+        try:
+            await db[collection_name].create_indexes(models)
+        except Exception as e:
+            ok = False
+            print(f"Failed to create indexes on {collection_name}: {e}")
+    return ok
+
+def _hot_queries():
+    """(name, explain command) for the queries served on every request"""
+    sample_user = ObjectId()
+    now = datetime.now()
+    return [
+        ("media by user", {
+            "find": "media", "filter": {"user_id": sample_user}, "sort": {"created_at": -1, "_id": -1}, "limit": 11
+        }),
+        ("media by user after cursor", {
+            "find": "media",
+            "filter": {"user_id": sample_user, "$or": [
+                {"created_at": {"$lt": now}},
+                {"created_at": now, "_id": {"$lt": ObjectId()}}
+            ]},
+            "sort": {"created_at": -1, "_id": -1}, "limit": 11
+        }),
+        ("media by user and type", {
+            "find": "media", "filter": {"user_id": sample_user, "media_type": "image"},
+            "sort": {"created_at": -1, "_id": -1}, "limit": 11
+        }),
+        ("user by username", {"find": "users", "filter": {"username": "__plan_check__"}, "limit": 1}),
+        ("user by email", {"find": "users", "filter": {"email": "__plan_check__"}, "limit": 1}),
+    ]
+
+def _plan_stages(plan):
+    """Every stage name in an explain plan tree (classic and slot-based engine layouts)"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+async def verify_query_plans(raise_on_collscan: bool = True) -> dict:
+    """
+    Run explain() on the hot queries and report each winning plan's stages
+
+    Raises:
+        QueryPlanError: if raise_on_collscan and any winning plan contains a COLLSCAN
+    """
+    db = get_database()
+    report = {}
+    for name, command in _hot_queries():
+        try:
+            explain = await db.command("explain", command, verbosity="queryPlanner")
+        except Exception as e:
+            print(f"Could not explain {name}: {e}")
+            report[name] = []
+            continue
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        report[name] = sorted(set(_plan_stages(winning_plan)))
+    scans = [name for name, stages in report.items() if "COLLSCAN" in stages]
+    if scans:
+        message = f"Collection scan in query plan: {', '.join(scans)}"
+        if raise_on_collscan:
+            raise QueryPlanError(message)
+        print(message)
+    return report
+
+async def _main():
+    await ensure_indexes()
+    try:
+        report = await verify_query_plans()
+    except QueryPlanError as e:
+        print(e)
+        return 1
+    for name, stages in report.items():
+        print(f"{name}: {', '.join(stages)}")
+    return 0
+
+if __name__ == "__main__":
+    # Apply indexes and check the hot query plans, e.g. in CI: python -m config.mongodb_indexes
+    sys.exit(asyncio.run(_main()))
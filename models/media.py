@@ -24,6 +24,9 @@ class MediaModel(BaseModel):
     url: str  # Cloudinary URL
     public_id: str  # Cloudinary public ID
     metadata: Optional[Dict] = {}
+    resource_type: Optional[str] = None  # Cloudinary resource type: image, video or raw
+    bytes: Optional[int] = None  # Size reported by Cloudinary
+    duration: Optional[float] = None  # Seconds, for audio and video
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
     model_config = ConfigDict(
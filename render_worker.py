@@ -0,0 +1,18 @@
+# Standalone render workers for the /media/create-video/jobs queue; run once per host,
+# separately from the API processes
+# python render_worker.py [process_count]  (default RENDER_WORKER_PROCESSES)
+import sys
+from config import RENDER_WORKER_PROCESSES
+from services.Media.render_jobs import render_worker_main, start_render_workers, stop_render_workers
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else RENDER_WORKER_PROCESSES
+    if count == 1:
+        render_worker_main()
+    else:
+        processes = start_render_workers(count)
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            stop_render_workers(processes)
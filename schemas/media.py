@@ -29,11 +29,81 @@ class MediaResponse(BaseModel):
 # Schema for media list response
 class MediaListResponse(BaseModel):
     media: list[MediaResponse]
-    total: int
-    page: int
+    total: Optional[int] = Field(None, description="Total matching media; omitted when include_total is false")
+    page: Optional[int] = Field(None, description="Page number in page mode; omitted when paging by cursor")
     size: int
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to get the next page")
+    has_more: bool = Field(False, description="Whether another page follows")
 
 # Schema for deleting media
 class MediaDelete(BaseModel):
     success: bool = Field(..., description="Whether deletion was successful")
-    message: str = Field(..., description="Deletion message")
\ No newline at end of file
+    message: str = Field(..., description="Deletion message")
+
+# Schema for deleting many media items in one request
+class BulkDeleteRequest(BaseModel):
+    media_ids: list[str] = Field(..., min_length=1, description="IDs of the media items to delete")
+
+class BulkDeleteItem(BaseModel):
+    id: str = Field(..., description="Media ID")
+    success: bool = Field(..., description="Whether this item was deleted")
+    error: Optional[str] = Field(None, description="Why this item was not deleted")
+
+class BulkDeleteResponse(BaseModel):
+    deleted: int = Field(..., description="Number of media items deleted")
+    failed: int = Field(..., description="Number of media items not deleted")
+    results: list[BulkDeleteItem] = Field(..., description="Outcome per requested media ID")
+
+# Schema for one item of a batch image generation
+class BatchImageItem(BaseModel):
+    prompt: str = Field(..., description="Prompt used for the image")
+    media_id: Optional[str] = Field(None, description="ID of the uploaded media")
+    url: Optional[str] = Field(None, description="Cloudinary URL")
+    error: Optional[str] = Field(None, description="Error message if generation or upload failed")
+
+# Schema for batch image generation response
+class BatchImageResponse(BaseModel):
+    images: list[BatchImageItem]
+    succeeded: int
+    failed: int
+
+# Schema for background render job status
+class RenderJobResponse(BaseModel):
+    id: str = Field(..., description="Job ID")
+    status: str = Field(..., description="queued, running, completed or failed")
+    progress: Optional[float] = Field(None, description="Render progress in percent")
+    attempts: int = Field(0, description="Number of attempts so far")
+    media_id: Optional[str] = Field(None, description="ID of the uploaded video once completed")
+    url: Optional[str] = Field(None, description="Cloudinary URL once completed")
+    error: Optional[str] = Field(None, description="Last error message")
+    created_at: datetime = Field(..., description="Creation timestamp")
+    updated_at: datetime = Field(..., description="Last update timestamp")
+
+# Schema for a signed direct-to-Cloudinary upload
+class DirectUploadSignature(BaseModel):
+    upload_url: str = Field(..., description="Cloudinary upload endpoint to POST the file to")
+    api_key: str = Field(..., description="Cloudinary API key to send with the upload")
+    cloud_name: str = Field(..., description="Cloudinary cloud name")
+    resource_type: str = Field(..., description="Cloudinary resource type of the upload")
+    params: Dict = Field(..., description="Signed parameters to send unchanged with the upload")
+    signature: str = Field(..., description="Signature of params")
+    expires_at: int = Field(..., description="Unix time after which Cloudinary rejects the signature")
+
+# Schema for registering a finished direct upload
+class DirectUploadComplete(BaseModel):
+    media_type: MediaType = Field(..., description="Type of media, as requested for the signature")
+    public_id: str = Field(..., description="public_id from Cloudinary's upload response")
+    version: int = Field(..., description="version from Cloudinary's upload response")
+    signature: str = Field(..., description="signature from Cloudinary's upload response")
+    content: Optional[str] = Field(None, max_length=500, description="Prompt or text content for the media")
+    metadata: Optional[Dict] = Field(default={}, description="Additional metadata")
+
+# Schema for a user's media dashboard counters
+class MediaStatsResponse(BaseModel):
+    user_id: str = Field(..., description="User ID")
+    total: int = Field(..., description="Number of media items")
+    counts: Dict[str, int] = Field(..., description="Number of media items per media type")
+    bytes: int = Field(..., description="Total size reported by Cloudinary")
+    duration: float = Field(..., description="Total audio and video duration in seconds")
+    updated_at: Optional[datetime] = Field(None, description="Last counter update")
+    reconciled_at: Optional[datetime] = Field(None, description="Last rebuild from the media collection")
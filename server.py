@@ -1,6 +1,7 @@
 #python -m fastapi dev .\server.py
 #python -m uvicorn main:api --reload
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from api.routes.media_generation import router as media_generation_router
 from api.routes.auth import router as auth_router
@@ -10,7 +11,13 @@ import uvicorn
 import time
 import logging
 from contextlib import asynccontextmanager
-from config import test_connection
+from config import test_connection, ensure_indexes, verify_query_plans
+from services import init_provider_clients, close_provider_clients, start_render_workers, stop_render_workers, \
+    clean_stale_temp_files, run_workspace_janitor, shutdown_upload_executor, run_media_stats_reconciler, \
+    quota_reservation, WorkspaceQuotaError
+from config import RENDER_WORKER_PROCESSES, RENDER_WORKERS_IN_API, UPLOAD_REQUEST_LIMITS, MONGODB_QUERY_PLAN_CHECK, \
+    MEDIA_STATS_RECONCILE_INTERVAL_SECONDS
+import asyncio
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -20,7 +27,24 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app:FastAPI):
     await test_connection()
+    await init_provider_clients()
+    await ensure_indexes()
+    if MONGODB_QUERY_PLAN_CHECK != "off":
+        # "fail" refuses to start when a hot query would scan its whole collection
+        await verify_query_plans(raise_on_collscan=MONGODB_QUERY_PLAN_CHECK == "fail")
+    # Remove temp files left behind by workers that crashed, then keep sweeping on a schedule
+    await asyncio.to_thread(clean_stale_temp_files)
+    background_tasks = [asyncio.create_task(run_workspace_janitor())]
+    if MEDIA_STATS_RECONCILE_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(run_media_stats_reconciler()))
+    # Render workers normally run on their own: python render_worker.py
+    render_workers = start_render_workers(RENDER_WORKER_PROCESSES) if RENDER_WORKERS_IN_API else []
     yield
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.to_thread(stop_render_workers, render_workers)
+    await close_provider_clients()
+    await asyncio.to_thread(shutdown_upload_executor)
 # Create FastAPI app
 api = FastAPI(
     title="Media Processing API",
@@ -51,6 +75,22 @@ async def log_requests(request: Request, call_next):
     process_time = time.time() - start_time
     logger.info(f"{request.method} {request.url.path} - {response.status_code} - {process_time:.4f}s")
     return response
+
+# Reject oversized uploads from Content-Length before the multipart body is read, and hold that many
+# bytes of the temp disk quota while the body is spooled, so a full quota pushes back on ingest
+@api.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    limit = UPLOAD_REQUEST_LIMITS.get(request.url.path)
+    content_length = request.headers.get("content-length")
+    if limit is None or not (content_length and content_length.isdigit()):
+        return await call_next(request)
+    if int(content_length) > limit:
+        return JSONResponse(status_code=413, content={"detail": f"Request body exceeds the {limit} byte limit"})
+    try:
+        async with quota_reservation(int(content_length)):
+            return await call_next(request)
+    except WorkspaceQuotaError as e:
+        return JSONResponse(status_code=503, content={"detail": f"Server busy, retry later: {e}"})
 @api.get("/")
 def index():
     return {
@@ -3,6 +3,7 @@ from models import User
 from schemas import UserCreate,UserLogin
 from config import user_collection
 from core import hash_password,verify_password
+from pymongo.errors import DuplicateKeyError
 collection = user_collection()
 async def get_user_by_username(username: str)-> User | None:
     try:
@@ -50,6 +51,12 @@ async def create_user(user:UserCreate) ->User:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Server error while creating user"
             )
+    except DuplicateKeyError:
+        # Unique username/email indexes catch signups racing past the checks above
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username or email already exists"
+        )
     except Exception as e:
         print("Error creating user:", e)
         raise HTTPException(
@@ -0,0 +1,177 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional
+import cloudinary.api
+import cloudinary.uploader
+import cloudinary.utils
+from cloudinary.exceptions import AuthorizationRequired, BadRequest, NotAllowed, NotFound
+from config import CLOUDINARY_UPLOAD_CONCURRENCY, CLOUDINARY_LARGE_UPLOAD_BYTES, CLOUDINARY_CHUNK_BYTES, \
+    CLOUDINARY_CHUNK_RETRIES, CLOUDINARY_RETRY_BACKOFF_SECONDS
+
+# Requests Cloudinary rejects for good; retrying them only delays the error
+_PERMANENT_ERRORS = (AuthorizationRequired, BadRequest, NotAllowed)
+
+# The Cloudinary SDK is blocking, so transfers run on a bounded pool off the event loop
+_upload_executor: Optional[ThreadPoolExecutor] = None
+_stats_lock = threading.Lock()
+_upload_stats = {
+    "uploads": 0, "chunked_uploads": 0, "failed": 0, "chunks": 0, "chunk_retries": 0,
+    "bytes": 0, "seconds": 0.0, "last_bytes_per_second": None
+}
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _upload_executor
+    if _upload_executor is None:
+        _upload_executor = ThreadPoolExecutor(
+            max_workers=max(1, CLOUDINARY_UPLOAD_CONCURRENCY), thread_name_prefix="cloudinary-upload"
+        )
+    return _upload_executor
+
+def shutdown_upload_executor():
+    global _upload_executor
+    if _upload_executor is not None:
+        _upload_executor.shutdown(wait=True)
+        _upload_executor = None
+
+def _count(**increments):
+    with _stats_lock:
+        for key, value in increments.items():
+            _upload_stats[key] += value
+
+def _upload_chunk(chunk_file, http_headers: Dict, options: Dict) -> Dict:
+    """Send one chunk, retrying transient failures with exponential backoff"""
+    for attempt in range(CLOUDINARY_CHUNK_RETRIES + 1):
+        try:
+            return cloudinary.uploader.upload_large_part(chunk_file, http_headers=http_headers, **options)
+        except _PERMANENT_ERRORS:
+            raise
+        except Exception as e:
+            if attempt == CLOUDINARY_CHUNK_RETRIES:
+                raise
+            _count(chunk_retries=1)
+            delay = CLOUDINARY_RETRY_BACKOFF_SECONDS * 2 ** attempt
+            print(f"Cloudinary chunk {http_headers['Content-Range']} failed ({e}), retrying in {delay:g}s")
+            time.sleep(delay)
+
+def _upload_large(file_path: str, file_size: int, chunk_size: int, options: Dict) -> Dict:
+    """
+    Chunked upload with the same protocol as cloudinary.uploader.upload_large, but each
+    chunk is retried on its own instead of restarting the whole transfer
+    """
+    options = dict(options)
+    upload_id = cloudinary.utils.random_public_id()
+    file_name = os.path.basename(file_path)
+    result = None
+    offset = 0
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            http_headers = {
+                "Content-Range": f"bytes {offset}-{offset + len(chunk) - 1}/{file_size}",
+                "X-Unique-Upload-Id": upload_id
+            }
+            result = _upload_chunk((file_name, chunk), http_headers, options)
+            # Later chunks must name the asset the first chunk created
+            options["public_id"] = result.get("public_id")
+            offset += len(chunk)
+            _count(chunks=1)
+    if result is None:
+        raise Exception(f"{file_path} is empty")
+    return result
+
+def _upload_sync(file_path: str, options: Dict) -> Dict:
+    file_size = os.path.getsize(file_path)
+    start = time.perf_counter()
+    try:
+        if file_size > CLOUDINARY_LARGE_UPLOAD_BYTES:
+            result = _upload_large(file_path, file_size, CLOUDINARY_CHUNK_BYTES, options)
+            _count(chunked_uploads=1)
+        else:
+            result = cloudinary.uploader.upload(file_path, **options)
+    except Exception:
+        _count(failed=1)
+        raise
+    elapsed = time.perf_counter() - start
+    with _stats_lock:
+        _upload_stats["uploads"] += 1
+        _upload_stats["bytes"] += file_size
+        _upload_stats["seconds"] += elapsed
+        _upload_stats["last_bytes_per_second"] = round(file_size / elapsed) if elapsed > 0 else None
+    return result
+
+async def upload_to_cloudinary(file_path: str, **options) -> Dict:
+    """
+    Upload a local file to Cloudinary without blocking the event loop
+
+    Files larger than CLOUDINARY_LARGE_UPLOAD_BYTES are sent in CLOUDINARY_CHUNK_BYTES chunks,
+    each retried up to CLOUDINARY_CHUNK_RETRIES times. `options` are passed to the Cloudinary API.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), partial(_upload_sync, file_path, options))
+
+async def get_cloudinary_resource(public_id: str, resource_type: str = "image") -> Optional[Dict]:
+    """Admin API details of an uploaded asset (run on the Cloudinary pool), None when it does not exist"""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_executor(), partial(
+            cloudinary.api.resource, public_id, resource_type=resource_type, type="upload"
+        ))
+    except NotFound:
+        return None
+
+# delete_resources accepts at most this many public IDs per call
+DELETE_BATCH_SIZE = 100
+
+async def destroy_cloudinary_asset(public_id: str, resource_type: str = "image") -> Dict:
+    """cloudinary.uploader.destroy on the Cloudinary pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(), partial(cloudinary.uploader.destroy, public_id, resource_type=resource_type)
+    )
+
+async def delete_cloudinary_resources(public_ids: List[str], resource_type: str = "image") -> Dict[str, str]:
+    """
+    Delete assets of one resource type with delete_resources, DELETE_BATCH_SIZE IDs per call,
+    batches running concurrently on the Cloudinary pool
+
+    Returns:
+        public_id -> Cloudinary's status ("deleted", "not_found", ...) or "error: <message>"
+        when the batch call failed
+    """
+    loop = asyncio.get_running_loop()
+    batches = [public_ids[i:i + DELETE_BATCH_SIZE] for i in range(0, len(public_ids), DELETE_BATCH_SIZE)]
+    responses = await asyncio.gather(*(
+        loop.run_in_executor(_get_executor(), partial(
+            cloudinary.api.delete_resources, batch, resource_type=resource_type, type="upload"
+        ))
+        for batch in batches
+    ), return_exceptions=True)
+
+    statuses = {}
+    for batch, response in zip(batches, responses):
+        if isinstance(response, BaseException):
+            statuses.update({public_id: f"error: {response}" for public_id in batch})
+            continue
+        deleted = response.get("deleted", {})
+        statuses.update({public_id: deleted.get(public_id, "error: missing from Cloudinary response") for public_id in batch})
+    return statuses
+
+def get_upload_stats() -> Dict:
+    """Cloudinary upload counters and throughput for this worker"""
+    with _stats_lock:
+        stats = dict(_upload_stats)
+    seconds = stats["seconds"]
+    return {
+        **stats,
+        "seconds": round(seconds, 4),
+        "bytes_per_second": round(stats["bytes"] / seconds) if seconds > 0 else None,
+        "max_concurrency": max(1, CLOUDINARY_UPLOAD_CONCURRENCY),
+        "large_upload_threshold_bytes": CLOUDINARY_LARGE_UPLOAD_BYTES,
+        "chunk_bytes": CLOUDINARY_CHUNK_BYTES
+    }
@@ -0,0 +1,79 @@
+import time
+from typing import Dict
+from uuid import uuid4
+import cloudinary
+import cloudinary.utils
+from config import media_collection
+from models.media import MediaType
+from .cloud_upload import get_cloudinary_resource
+from .media_utils import MEDIA_UPLOAD_TARGETS, record_media, media_resource_type
+
+# Cloudinary rejects signed requests older than one hour
+SIGNATURE_TTL_SECONDS = 3600
+
+class DirectUploadError(Exception):
+    """A direct upload could not be verified or registered"""
+
+def _user_folder(user_id: str, media_type: MediaType) -> str:
+    folder, _ = MEDIA_UPLOAD_TARGETS.get(media_type, ("media", "auto"))
+    return f"{folder}/{user_id}"
+
+def create_upload_signature(user_id: str, media_type: MediaType) -> Dict:
+    """
+    Sign a browser-to-Cloudinary upload of one asset
+
+    The signature covers a public_id generated inside the user's folder, so the client can
+    upload exactly one asset there and nowhere else. The client posts the file together with
+    the returned `params`, `api_key` and `signature` to `upload_url`.
+    """
+    config = cloudinary.config()
+    _, resource_type = MEDIA_UPLOAD_TARGETS.get(media_type, ("media", "auto"))
+    params = {
+        "public_id": f"{_user_folder(user_id, media_type)}/{uuid4().hex}",
+        "timestamp": int(time.time())
+    }
+    return {
+        "upload_url": f"https://api.cloudinary.com/v1_1/{config.cloud_name}/{resource_type}/upload",
+        "api_key": config.api_key,
+        "cloud_name": config.cloud_name,
+        "resource_type": resource_type,
+        "params": params,
+        "signature": cloudinary.utils.api_sign_request(params, config.api_secret),
+        "expires_at": params["timestamp"] + SIGNATURE_TTL_SECONDS
+    }
+
+async def register_direct_upload(user_id: str, media_type: MediaType, public_id: str, version: int, signature: str,
+                                 prompt: str = None, metadata: Dict = None) -> Dict:
+    """
+    Record an asset the client uploaded straight to Cloudinary
+
+    `public_id`, `version` and `signature` come from Cloudinary's upload response; the signature
+    proves the response is genuine, and the public_id must lie in the user's folder. The signature
+    covers nothing else, so resource type, size, duration and format are read back from Cloudinary.
+    """
+    if not public_id.startswith(_user_folder(user_id, media_type) + "/"):
+        raise DirectUploadError("Asset is not in this user's upload folder")
+    if not cloudinary.utils.verify_api_response_signature(public_id, version, signature):
+        raise DirectUploadError("Invalid upload signature")
+    if await media_collection().find_one({"public_id": public_id}, {"_id": 1}):
+        raise DirectUploadError("Asset is already registered")
+
+    resource_type = media_resource_type({"media_type": media_type.value})
+    resource = await get_cloudinary_resource(public_id, resource_type)
+    if resource is None:
+        raise DirectUploadError(f"No {resource_type} asset with this public_id in Cloudinary")
+    if str(resource.get("version")) != str(version):
+        raise DirectUploadError("Asset version does not match Cloudinary")
+
+    upload_result = {
+        "public_id": public_id,
+        "secure_url": resource["secure_url"],
+        "resource_type": resource["resource_type"],
+        "format": resource.get("format"),
+        "bytes": resource.get("bytes"),
+        "duration": resource.get("duration")
+    }
+    return await record_media(
+        user_id, upload_result, resource_type, prompt or public_id.rsplit("/", 1)[-1],
+        metadata, media_type=media_type
+    )
@@ -0,0 +1,159 @@
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+from config import FFMPEG_MAX_CONCURRENCY, FFMPEG_TIMEOUT_SECONDS
+
+class FFmpegError(Exception):
+    """ffmpeg exited with an error, timed out or was cancelled"""
+
+# Global cap on concurrent encodes, created lazily inside the running event loop
+_ffmpeg_semaphore: Optional[asyncio.Semaphore] = None
+_ffmpeg_stats = {"running": 0, "waiting": 0, "completed": 0, "failed": 0, "timed_out": 0, "cancelled": 0}
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _ffmpeg_semaphore
+    if _ffmpeg_semaphore is None:
+        _ffmpeg_semaphore = asyncio.Semaphore(max(1, FFMPEG_MAX_CONCURRENCY))
+    return _ffmpeg_semaphore
+
+async def run_ffmpeg_tool(command: List[str]):
+    """Run a short ffmpeg/ffprobe command without blocking the event loop and return (stdout, stderr)"""
+    process = await asyncio.create_subprocess_exec(
+        *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise FFmpegError(f"{command[0]} failed: {stderr.decode(errors='ignore')[-500:]}")
+    return stdout.decode(errors="ignore"), stderr.decode(errors="ignore")
+
+async def probe_duration(media_file) -> float:
+    """Duration of a media file in seconds, from ffprobe"""
+    stdout, _ = await run_ffmpeg_tool([
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        media_file
+    ])
+    return float(stdout.strip())
+
+async def _read_progress(stream, duration: Optional[float], on_progress):
+    """Parse `-progress pipe:1` key=value blocks and report each one"""
+    block: Dict[str, str] = {}
+    async for raw_line in stream:
+        line = raw_line.decode(errors="ignore").strip()
+        if "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        block[key] = value
+        if key != "progress":
+            continue
+        try:
+            out_time = int(block.get("out_time_us") or block.get("out_time_ms") or 0) / 1_000_000
+        except ValueError:
+            out_time = 0.0
+        progress = {
+            "out_time": out_time,
+            "speed": block.get("speed"),
+            "finished": value == "end",
+            "percent": min(100.0, round(out_time / duration * 100, 1)) if duration else None
+        }
+        if value == "end":
+            progress["percent"] = 100.0
+        if on_progress is not None:
+            try:
+                on_progress(progress)
+            except Exception as e:
+                print(f"Error in ffmpeg progress callback: {e}")
+        block = {}
+
+async def _collect_stderr(stream, tail: deque):
+    async for raw_line in stream:
+        tail.append(raw_line.decode(errors="ignore").rstrip())
+
+async def _watch_disconnect(is_disconnected: Callable[[], Awaitable[bool]], interval: float = 1.0):
+    while not await is_disconnected():
+        await asyncio.sleep(interval)
+
+async def _stop_process(process):
+    if process.returncode is not None:
+        return
+    process.terminate()
+    try:
+        await asyncio.wait_for(process.wait(), timeout=5)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+
+async def run_ffmpeg(
+    args: List[str],
+    duration: Optional[float] = None,
+    on_progress: Optional[Callable[[Dict], None]] = None,
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    timeout: Optional[float] = FFMPEG_TIMEOUT_SECONDS
+):
+    """
+    Run an ffmpeg encode as an asyncio subprocess under the global concurrency limit
+
+    Args:
+        args: ffmpeg arguments, without the leading "ffmpeg"
+        duration: expected output duration in seconds, used to compute percent progress
+        on_progress: called with each parsed `-progress` block
+        is_disconnected: polled while running (e.g. request.is_disconnected); the encode is
+            killed as soon as it returns True
+        timeout: seconds before the encode is killed
+    """
+    command = ["ffmpeg", "-hide_banner", "-nostats", "-progress", "pipe:1", *args]
+    _ffmpeg_stats["waiting"] += 1
+    try:
+        await _get_semaphore().acquire()
+    finally:
+        _ffmpeg_stats["waiting"] -= 1
+    _ffmpeg_stats["running"] += 1
+    stderr_tail: deque = deque(maxlen=20)
+    process = None
+    watcher = None
+    work = None
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command, stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        work = asyncio.gather(
+            _read_progress(process.stdout, duration, on_progress),
+            _collect_stderr(process.stderr, stderr_tail),
+            process.wait()
+        )
+        waiters = {work}
+        if is_disconnected is not None:
+            watcher = asyncio.ensure_future(_watch_disconnect(is_disconnected))
+            waiters.add(watcher)
+
+        done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        if not done:
+            _ffmpeg_stats["timed_out"] += 1
+            raise FFmpegError(f"ffmpeg timed out after {timeout:g}s")
+        if watcher is not None and watcher in done:
+            _ffmpeg_stats["cancelled"] += 1
+            raise FFmpegError("ffmpeg cancelled: client disconnected")
+
+        if process.returncode != 0:
+            _ffmpeg_stats["failed"] += 1
+            raise FFmpegError(f"ffmpeg exited with code {process.returncode}: " + "\n".join(stderr_tail))
+        _ffmpeg_stats["completed"] += 1
+    except asyncio.CancelledError:
+        _ffmpeg_stats["cancelled"] += 1
+        raise
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+        if process is not None:
+            await _stop_process(process)
+        if work is not None and not work.done():
+            work.cancel()
+            await asyncio.gather(work, return_exceptions=True)
+        _ffmpeg_stats["running"] -= 1
+        _get_semaphore().release()
+
+def get_ffmpeg_stats() -> Dict:
+    """Counters for ffmpeg jobs run in this worker"""
+    return {**_ffmpeg_stats, "max_concurrency": max(1, FFMPEG_MAX_CONCURRENCY)}
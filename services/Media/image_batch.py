@@ -0,0 +1,105 @@
+import asyncio
+import base64
+from typing import Dict, List, Optional
+from config import IMAGE_BATCH_MAX_N, IMAGE_BATCH_CONCURRENCY
+from .provider_clients import get_provider_client
+from .text_to_image import detect_image_format
+from .workspace import temp_path
+
+# Per-provider caps on concurrent image requests, shared by every batch in the process
+_provider_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+def _get_semaphore(model: str) -> asyncio.Semaphore:
+    semaphore = _provider_semaphores.get(model)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(IMAGE_BATCH_CONCURRENCY.get(model, 4))
+        _provider_semaphores[model] = semaphore
+    return semaphore
+
+def _write_image(image_data: bytes, output_file: str) -> str:
+    with open(output_file, "wb") as f:
+        f.write(image_data)
+    return output_file
+
+async def _render_flux(prompt: str, count: int, width: int, height: int) -> List[bytes]:
+    """Render `count` images of one prompt in a single Together request using `n`"""
+    client = get_provider_client("together")
+    async with _get_semaphore("flux"):
+        response = await client.images.generate(
+            prompt=prompt,
+            model="black-forest-labs/FLUX.1-schnell-Free",
+            width=width,
+            height=height,
+            steps=4,
+            n=count,
+            response_format="b64_json",
+        )
+    return [base64.b64decode(item.b64_json) for item in response.data]
+
+async def _render_gemini(prompt: str) -> bytes:
+    from google.genai import types
+    client = get_provider_client("gemini")
+    async with _get_semaphore("gemini"):
+        response = await client.aio.models.generate_content(
+            model="gemini-2.0-flash-preview-image-generation",
+            contents=prompt,
+            config=types.GenerateContentConfig(
+            response_modalities=['TEXT', 'IMAGE']
+            )
+        )
+    for part in response.candidates[0].content.parts:
+        if part.inline_data is not None:
+            return part.inline_data.data
+    raise Exception("No image returned by the provider")
+
+async def generate_images_batch(model, prompts: List[str], width=1024, height=768, workspace=None) -> List[Dict]:
+    """
+    Generate one image per prompt with bounded concurrency
+
+    Identical flux prompts are grouped into Together requests using `n`;
+    gemini prompts fan out one request each under the provider's cap.
+
+    Returns:
+        One dict per prompt, in order, with either "file" (image path in `workspace`, or TEMP_DIR) or "error"
+    """
+    results: List[Optional[Dict]] = [None] * len(prompts)
+
+    async def store(index: int, image_data: bytes):
+        # Keep the provider's encoding; the extension follows the detected format
+        output_file = temp_path(f".{detect_image_format(image_data)}", workspace)
+        await asyncio.to_thread(_write_image, image_data, output_file)
+        results[index] = {"prompt": prompts[index], "file": output_file}
+
+    async def run_flux_group(prompt: str, indexes: List[int]):
+        try:
+            images = await _render_flux(prompt, len(indexes), width, height)
+            if len(images) < len(indexes):
+                raise Exception(f"Provider returned {len(images)} of {len(indexes)} images")
+            for index, image_data in zip(indexes, images):
+                await store(index, image_data)
+        except Exception as e:
+            for index in indexes:
+                if results[index] is None:
+                    results[index] = {"prompt": prompt, "error": str(e)}
+
+    async def run_gemini(index: int):
+        try:
+            await store(index, await _render_gemini(prompts[index]))
+        except Exception as e:
+            results[index] = {"prompt": prompts[index], "error": str(e)}
+
+    jobs = []
+    if model == "flux":
+        groups: Dict[str, List[int]] = {}
+        for index, prompt in enumerate(prompts):
+            groups.setdefault(prompt.strip(), []).append(index)
+        for prompt, indexes in groups.items():
+            for start in range(0, len(indexes), IMAGE_BATCH_MAX_N):
+                jobs.append(run_flux_group(prompt, indexes[start:start + IMAGE_BATCH_MAX_N]))
+    elif model == "gemini":
+        jobs = [run_gemini(index) for index in range(len(prompts))]
+    else:
+        raise ValueError(f"Unsupported image model: {model}")
+
+    await asyncio.gather(*jobs)
+    return results
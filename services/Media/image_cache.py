@@ -0,0 +1,62 @@
+import asyncio
+from typing import Dict, Tuple
+from config import IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES
+from .cache_utils import ContentStore, make_cache_key
+from .text_to_image import generate_image_bytes_async
+from .single_flight import get_single_flight
+
+# Generated images stored under a hash of (model, prompt, width, height)
+image_store = ContentStore(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES)
+_image_cache_stats = {"hits": 0, "misses": 0, "bypassed": 0}
+
+def image_cache_key(model, prompt, width=1024, height=768) -> str:
+    return make_cache_key("image", model, prompt.strip(), width, height)
+
+async def generate_image_cached(model, prompt, width=1024, height=768, use_cache=True) -> Tuple[bytes, bool]:
+    """
+    Generate an image, serving identical requests from the content-addressed store
+
+    Returns:
+        (provider image bytes in their original format, whether it was a cache hit)
+    """
+    if not use_cache:
+        _image_cache_stats["bypassed"] += 1
+        return await generate_image_bytes_async(model, prompt, width, height), False
+
+    key = image_cache_key(model, prompt, width, height)
+    cached_file = image_store.get(key, "img")
+    if cached_file:
+        try:
+            image_data = await asyncio.to_thread(_read_file, cached_file)
+            _image_cache_stats["hits"] += 1
+            return image_data, True
+        except FileNotFoundError:
+            pass  # evicted between lookup and read
+
+    _image_cache_stats["misses"] += 1
+    # Concurrent identical misses wait on one render and share its bytes
+    image_data = await get_single_flight("image").do(
+        key, _render_and_store, key, model, prompt, width, height
+    )
+    return image_data, False
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+async def _render_and_store(key, model, prompt, width, height) -> bytes:
+    image_data = await generate_image_bytes_async(model, prompt, width, height)
+    try:
+        # Stored as-is; the format is detected from the bytes when served
+        await asyncio.to_thread(image_store.put_bytes, key, image_data, "img")
+    except Exception as e:
+        print(f"Error writing image cache: {e}")
+    return image_data
+
+def get_image_cache_stats() -> Dict:
+    """Hit/miss counters and disk usage for the image cache"""
+    return {
+        **_image_cache_stats,
+        "bytes": image_store.total_bytes(),
+        "max_bytes": image_store.max_bytes
+    }
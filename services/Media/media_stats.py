@@ -0,0 +1,133 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional
+from bson import ObjectId
+from pymongo import UpdateOne
+from config import media_collection, media_stats_collection, MEDIA_STATS_RECONCILE_INTERVAL_SECONDS
+from models.media import MediaType
+
+# One document per user, _id = user ObjectId:
+#   {total, counts: {image, audio, video, text}, bytes, duration, updated_at, reconciled_at}
+
+def _media_type_value(media_type) -> str:
+    return media_type.value if isinstance(media_type, MediaType) else str(media_type)
+
+async def increment_media_stats(user_id: str, media_type, count: int = 1, size: Optional[int] = None,
+                                duration: Optional[float] = None):
+    """Atomically add (or with a negative count, remove) media to a user's counters"""
+    increments = {"total": count, f"counts.{_media_type_value(media_type)}": count}
+    if size:
+        increments["bytes"] = size if count > 0 else -size
+    if duration:
+        increments["duration"] = duration if count > 0 else -duration
+    try:
+        await media_stats_collection().update_one(
+            {"_id": ObjectId(user_id)},
+            {"$inc": increments, "$set": {"updated_at": datetime.now()}},
+            upsert=True
+        )
+    except Exception as e:
+        # The reconciler repairs counters that missed an update
+        print(f"Error updating media stats for {user_id}: {e}")
+
+async def remove_media_from_stats(user_id: str, media_docs: List[Dict]):
+    """Subtract many deleted media documents from a user's counters in one update"""
+    if not media_docs:
+        return
+    increments = {"total": -len(media_docs)}
+    size = sum(doc.get("bytes") or 0 for doc in media_docs)
+    duration = sum(doc.get("duration") or 0 for doc in media_docs)
+    for doc in media_docs:
+        key = f"counts.{_media_type_value(doc['media_type'])}"
+        increments[key] = increments.get(key, 0) - 1
+    if size:
+        increments["bytes"] = -size
+    if duration:
+        increments["duration"] = -duration
+    try:
+        await media_stats_collection().update_one(
+            {"_id": ObjectId(user_id)},
+            {"$inc": increments, "$set": {"updated_at": datetime.now()}},
+            upsert=True
+        )
+    except Exception as e:
+        print(f"Error updating media stats for {user_id}: {e}")
+
+def _empty_stats() -> Dict:
+    return {"total": 0, "counts": {t.value: 0 for t in MediaType}, "bytes": 0, "duration": 0.0}
+
+def _stats_response(user_id: str, doc: Dict) -> Dict:
+    stats = _empty_stats()
+    stats["total"] = doc.get("total", 0)
+    stats["counts"].update(doc.get("counts") or {})
+    stats["bytes"] = doc.get("bytes", 0)
+    stats["duration"] = round(doc.get("duration", 0.0), 3)
+    return {
+        "user_id": user_id,
+        **stats,
+        "updated_at": doc.get("updated_at"),
+        "reconciled_at": doc.get("reconciled_at")
+    }
+
+async def get_media_stats(user_id: str) -> Dict:
+    """A user's media counters in one document read; built on first use for users without one"""
+    doc = await media_stats_collection().find_one({"_id": ObjectId(user_id)})
+    if doc is None:
+        await reconcile_media_stats(user_id)
+        doc = await media_stats_collection().find_one({"_id": ObjectId(user_id)}) or {}
+    return _stats_response(user_id, doc)
+
+async def reconcile_media_stats(user_id: Optional[str] = None) -> int:
+    """
+    Rebuild counters from the media collection, for one user or for everyone
+
+    Increments that land while the aggregation runs can be lost or counted twice;
+    the next run corrects them.
+
+    Returns:
+        Number of users whose counters were written
+    """
+    match = {"user_id": ObjectId(user_id)} if user_id else {}
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "media_type": "$media_type"},
+            "count": {"$sum": 1},
+            "bytes": {"$sum": {"$ifNull": ["$bytes", 0]}},
+            "duration": {"$sum": {"$ifNull": ["$duration", 0]}}
+        }}
+    ]
+    users: Dict[ObjectId, Dict] = {}
+    async for row in media_collection().aggregate(pipeline):
+        stats = users.setdefault(row["_id"]["user_id"], _empty_stats())
+        stats["total"] += row["count"]
+        stats["counts"][row["_id"]["media_type"]] = row["count"]
+        stats["bytes"] += row["bytes"]
+        stats["duration"] += row["duration"]
+    if user_id and not users:
+        users[ObjectId(user_id)] = _empty_stats()
+
+    now = datetime.now()
+    operations = [
+        UpdateOne({"_id": uid}, {"$set": {**stats, "updated_at": now, "reconciled_at": now}}, upsert=True)
+        for uid, stats in users.items()
+    ]
+    for start in range(0, len(operations), 1000):
+        await media_stats_collection().bulk_write(operations[start:start + 1000], ordered=False)
+    if not user_id:
+        # Users whose media were all deleted
+        await media_stats_collection().update_many(
+            {"reconciled_at": {"$ne": now}},
+            {"$set": {**_empty_stats(), "updated_at": now, "reconciled_at": now}}
+        )
+    return len(operations)
+
+async def run_media_stats_reconciler(interval: float = MEDIA_STATS_RECONCILE_INTERVAL_SECONDS):
+    """Rebuild every user's counters every `interval` seconds until cancelled"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            count = await reconcile_media_stats()
+            print(f"Reconciled media stats for {count} users")
+        except Exception as e:
+            print(f"Media stats reconciliation failed: {e}")
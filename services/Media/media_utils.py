@@ -1,14 +1,21 @@
 import subprocess
 import os
+import asyncio
+import base64
+import json
 import tempfile
 from config import TEMP_DIR
 import cloudinary
 import cloudinary.uploader
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from config import media_collection
 from models.media import MediaModel, MediaType
 from bson import ObjectId
+from .ffmpeg_runner import run_ffmpeg, probe_duration
+from .workspace import temp_path
+from .cloud_upload import upload_to_cloudinary, destroy_cloudinary_asset, delete_cloudinary_resources
+from .media_stats import increment_media_stats, remove_media_from_stats, reconcile_media_stats, get_media_stats
 
 media_colt = media_collection()
 
@@ -34,7 +41,7 @@ async def upload_media(file_path: str, user_id: str, folder: str = "media", reso
     
     # Upload to Cloudinary
     try:
-        upload_result = cloudinary.uploader.upload(
+        upload_result = await upload_to_cloudinary(
             file_path,
             folder=folder,
             resource_type=resource_type,
@@ -44,14 +51,28 @@ async def upload_media(file_path: str, user_id: str, folder: str = "media", reso
     except Exception as e:
         raise Exception(f"Failed to upload media to Cloudinary: {str(e)}")
 
+    return await record_media(user_id, upload_result, resource_type, prompt, metadata)
+
+# Cloudinary folder and resource type used for each media type
+MEDIA_UPLOAD_TARGETS = {
+    MediaType.IMAGE: ("images", "image"),
+    MediaType.AUDIO: ("audio", "auto"),
+    MediaType.VIDEO: ("videos", "video"),
+    MediaType.TEXT: ("text", "raw")
+}
+
+async def record_media(user_id: str, upload_result: Dict, resource_type: str = "auto", prompt: str = None,
+                       metadata: Dict = None, media_type: Optional[MediaType] = None) -> Dict:
+    """Save the MongoDB document for an asset already stored in Cloudinary"""
     # Determine media type
-    media_type = MediaType.TEXT
-    if resource_type == "image" or (resource_type == "auto" and upload_result.get("resource_type") == "image"):
-        media_type = MediaType.IMAGE
-    elif resource_type == "video" or (resource_type == "auto" and upload_result.get("resource_type") == "video"):
-        media_type = MediaType.VIDEO
-    elif upload_result.get("format") in ["mp3", "wav", "ogg"]:
-        media_type = MediaType.AUDIO
+    if media_type is None:
+        media_type = MediaType.TEXT
+        if resource_type == "image" or (resource_type == "auto" and upload_result.get("resource_type") == "image"):
+            media_type = MediaType.IMAGE
+        elif resource_type == "video" or (resource_type == "auto" and upload_result.get("resource_type") == "video"):
+            media_type = MediaType.VIDEO
+        elif upload_result.get("format") in ["mp3", "wav", "ogg"]:
+            media_type = MediaType.AUDIO
     
     # Create media document
     media_doc = MediaModel(
@@ -61,6 +82,9 @@ async def upload_media(file_path: str, user_id: str, folder: str = "media", reso
         url=upload_result["secure_url"],
         public_id=upload_result["public_id"],
         metadata=metadata or {},
+        resource_type=upload_result.get("resource_type"),
+        bytes=upload_result.get("bytes"),
+        duration=upload_result.get("duration"),
         created_at=datetime.now(),
         updated_at=datetime.now()
     )
@@ -69,11 +93,14 @@ async def upload_media(file_path: str, user_id: str, folder: str = "media", reso
     if not media_collection:
         raise Exception("Media collection is not initialized")
     try:
-        media_dict = media_doc.model_dump(by_alias=True)
+        # Let MongoDB assign the ObjectId, and store user_id as the ObjectId every query filters on
+        media_dict = media_doc.model_dump(by_alias=True, exclude={"id"})
+        media_dict["user_id"] = ObjectId(user_id)
         result = await media_collection().insert_one(media_dict)
         print(f"Inserted media document into MongoDB with ID {result.inserted_id}")
     except Exception as e:
         raise Exception(f"Failed to insert media into MongoDB: {str(e)}")
+    await increment_media_stats(user_id, media_type, 1, media_doc.bytes, media_doc.duration)
 
     return {
         "id": str(result.inserted_id),
@@ -96,39 +123,83 @@ async def get_media_by_id(media_id: str) -> Optional[Dict]:
         print(f"Error getting media: {e}")
         return None
 
-async def get_media_by_user(user_id: str, page: int = 1, size: int = 10, media_type: Optional[MediaType] = None) -> Dict:
-    """Get media by user ID with pagination and optional filtering"""
+def encode_media_cursor(media: Dict) -> str:
+    """Opaque cursor pointing just after `media` in newest-first order"""
+    position = {"t": media["created_at"].isoformat(), "id": str(media["_id"])}
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip("=")
+
+def decode_media_cursor(cursor: str):
+    """(created_at, _id) from a cursor made by encode_media_cursor; raises ValueError if malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(position["t"]), ObjectId(position["id"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+async def get_media_by_user(user_id: str, page: int = 1, size: int = 10, media_type: Optional[MediaType] = None,
+                            cursor: Optional[str] = None, include_total: bool = True) -> Dict:
+    """
+    Get media by user ID, newest first, with optional filtering
+
+    With `cursor` (the next_cursor of the previous page) the query seeks straight to the
+    position after it on the (user_id, created_at, _id) index, so every page costs the same;
+    otherwise `page` is used with skip. include_total=False leaves out the count query.
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    position = decode_media_cursor(cursor) if cursor else None
     try:
-        from bson import ObjectId
-        skip = (page - 1) * size
-        
         # Build query filter
         query_filter = {"user_id": ObjectId(user_id)}
         if media_type:
             query_filter["media_type"] = media_type.value
-        
-        # Get total count
-        total = await media_collection().count_documents(query_filter)
-        
-        # Get media with pagination
-        cursor = media_collection().find(query_filter).skip(skip).limit(size).sort("created_at", -1)
+
+        # Total from the user's maintained counters instead of counting documents
+        total = None
+        if include_total:
+            stats = await get_media_stats(user_id)
+            total = stats["counts"].get(media_type.value, 0) if media_type else stats["total"]
+
+        page_filter = dict(query_filter)
+        if position:
+            created_at, last_id = position
+            page_filter["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": last_id}}
+            ]
+        # _id breaks ties between items created in the same instant, so no item is skipped or repeated
+        cursor_query = media_collection().find(page_filter).sort([("created_at", -1), ("_id", -1)])
+        if not position:
+            cursor_query = cursor_query.skip((page - 1) * size)
+        # One extra item tells whether another page follows
+        cursor_query = cursor_query.limit(size + 1)
+
         media_list = []
-        
-        async for media in cursor:
+        async for media in cursor_query:
+            media_list.append(media)
+        has_more = len(media_list) > size
+        media_list = media_list[:size]
+        next_cursor = encode_media_cursor(media_list[-1]) if has_more else None
+
+        for media in media_list:
             media["id"] = str(media["_id"])
             media["user_id"] = str(media["user_id"])
             del media["_id"]
-            media_list.append(media)
-            
+
         return {
             "media": media_list,
             "total": total,
-            "page": page,
-            "size": size
+            "page": None if position else page,
+            "size": size,
+            "next_cursor": next_cursor,
+            "has_more": has_more
         }
     except Exception as e:
         print(f"Error getting user media: {e}")
-        return {"media": [], "total": 0, "page": page, "size": size}
+        return {"media": [], "total": 0 if include_total else None, "page": page, "size": size,
+                "next_cursor": None, "has_more": False}
 
 async def update_media(media_id: str, user_id: str, update_data: Dict) -> Optional[Dict]:
     """Update media metadata"""
@@ -161,16 +232,90 @@ async def delete_media(media_id: str, user_id: str) -> bool:
             return False
             
         # Delete from Cloudinary
-        cloudinary.uploader.destroy(media["public_id"])
+        await destroy_cloudinary_asset(media["public_id"], media_resource_type(media))
         
         # Delete from MongoDB
         result = await media_collection().delete_one({"_id": ObjectId(media_id), "user_id": ObjectId(user_id)})
+        if result.deleted_count:
+            await increment_media_stats(user_id, media["media_type"], -1, media.get("bytes"), media.get("duration"))
         
         return result.deleted_count > 0
     except Exception as e:
         print(f"Error deleting media: {e}")
         return False
 
+def media_resource_type(media: Dict) -> str:
+    """Cloudinary resource type of a media document; older documents are mapped from media_type"""
+    if media.get("resource_type"):
+        return media["resource_type"]
+    # Cloudinary stores audio under the video resource type
+    return {"image": "image", "video": "video", "audio": "video"}.get(media.get("media_type"), "raw")
+
+async def bulk_delete_media(media_ids: List[str], user_id: str) -> List[Dict]:
+    """
+    Delete many media items from Cloudinary and MongoDB
+
+    One find for all items, delete_resources batches per Cloudinary resource type, then one
+    delete_many for the items Cloudinary removed (or no longer had).
+
+    Returns:
+        One {"id", "success", "error"} dict per requested ID, in order
+    """
+    results = {media_id: {"id": media_id, "success": False, "error": None} for media_id in media_ids}
+    object_ids = {}
+    for media_id in results:
+        if ObjectId.is_valid(media_id):
+            object_ids[ObjectId(media_id)] = media_id
+        else:
+            results[media_id]["error"] = "Invalid media ID"
+
+    owner = ObjectId(user_id)
+    docs = {}
+    async for media in media_collection().find(
+        {"_id": {"$in": list(object_ids)}, "user_id": owner},
+        {"public_id": 1, "media_type": 1, "resource_type": 1, "bytes": 1, "duration": 1}
+    ):
+        docs[media["_id"]] = media
+    for object_id, media_id in object_ids.items():
+        if object_id not in docs:
+            results[media_id]["error"] = "Media not found or not authorized"
+
+    # Group by resource type: delete_resources only deletes assets of the type it is called with
+    groups: Dict[str, List[str]] = {}
+    for media in docs.values():
+        groups.setdefault(media_resource_type(media), []).append(media["public_id"])
+    statuses = {}
+    for resource_type, public_ids in groups.items():
+        statuses.update(await delete_cloudinary_resources(public_ids, resource_type))
+
+    removable = []
+    for object_id, media in docs.items():
+        status = statuses.get(media["public_id"], "error: not sent")
+        if status in ("deleted", "not_found"):
+            removable.append(object_id)
+        else:
+            results[object_ids[object_id]]["error"] = f"Cloudinary: {status}"
+
+    if removable:
+        try:
+            result = await media_collection().delete_many({"_id": {"$in": removable}, "user_id": owner})
+        except Exception as e:
+            for object_id in removable:
+                results[object_ids[object_id]]["error"] = f"Failed to delete from MongoDB: {e}"
+        else:
+            for object_id in removable:
+                results[object_ids[object_id]]["success"] = True
+            if result.deleted_count == len(removable):
+                await remove_media_from_stats(user_id, [docs[object_id] for object_id in removable])
+            else:
+                # A concurrent delete already removed (and counted) some of these documents
+                try:
+                    await reconcile_media_stats(user_id)
+                except Exception as e:
+                    print(f"Error reconciling media stats for {user_id}: {e}")
+
+    return [results[media_id] for media_id in media_ids]
+
 def create_video(image_path, audio_path, output_path=None):
     """Create a video from an image and audio using FFmpeg"""
     if not output_path:
@@ -225,6 +370,280 @@ def add_subtitles(video_path, subtitle_path, output_path=None):
         print(f"Error adding subtitles: {e}")
         return None
 
+async def create_video_async(image_path, audio_path, output_path=None, on_progress=None, is_disconnected=None):
+    """Create a video from an image and audio with the non-blocking ffmpeg runner"""
+    if not output_path:
+        output_path = os.path.join(TEMP_DIR, f"{os.path.splitext(os.path.basename(image_path))[0]}.mp4")
+
+    duration = await _probe_duration_or_none(audio_path)
+    await run_ffmpeg([
+        "-loop", "1",  # Loop the image
+        "-i", image_path,  # Input image
+        "-i", audio_path,  # Input audio
+        "-c:v", "libx264",  # Video codec
+        "-tune", "stillimage",  # Optimize for still images
+        "-c:a", "aac",  # Audio codec
+        "-b:a", "192k",  # Audio bitrate
+        "-pix_fmt", "yuv420p",  # Pixel format
+        "-shortest",  # Match video duration to audio
+        "-y",  # Overwrite output file if it exists
+        output_path  # Output file
+    ], duration=duration, on_progress=on_progress, is_disconnected=is_disconnected)
+    return output_path
+
+async def add_subtitles_async(video_path, subtitle_path, output_path=None, on_progress=None, is_disconnected=None):
+    """Burn subtitles into a video with the non-blocking ffmpeg runner"""
+    if not output_path:
+        output_path = os.path.join(TEMP_DIR, f"sub_{os.path.basename(video_path)}")
+
+    video_path_abs = video_path.replace('\\', '/')
+    subtitle_path_abs = subtitle_path.replace('\\', '/')
+    output_path_abs = output_path.replace('\\', '/')
+
+    duration = await _probe_duration_or_none(video_path)
+    await run_ffmpeg([
+        "-i", video_path_abs,  # Input video
+        "-vf", f"subtitles='{subtitle_path_abs}'",  # Quote the subtitle path
+        "-c:a", "copy",  # Copy audio without re-encoding
+        "-y",  # Overwrite output file if it exists
+        output_path_abs  # Output video
+    ], duration=duration, on_progress=on_progress, is_disconnected=is_disconnected)
+    return output_path
+
+async def create_video_with_subtitles_async(image_path, audio_path, subtitle_path, output_path=None,
+                                           on_progress=None, is_disconnected=None):
+    """Create a subtitled video in one encode: looped image, audio and the subtitles filter in a single graph"""
+    if not output_path:
+        output_path = os.path.join(TEMP_DIR, f"{os.path.splitext(os.path.basename(image_path))[0]}.mp4")
+
+    subtitle_path_abs = subtitle_path.replace('\\', '/')
+
+    duration = await _probe_duration_or_none(audio_path)
+    await run_ffmpeg([
+        "-loop", "1",  # Loop the image
+        "-i", image_path,  # Input image
+        "-i", audio_path,  # Input audio
+        "-vf", f"subtitles='{subtitle_path_abs}'",  # Burn subtitles in the same pass
+        "-c:v", "libx264",  # Video codec
+        "-tune", "stillimage",  # Optimize for still images
+        "-c:a", "aac",  # Audio codec
+        "-b:a", "192k",  # Audio bitrate
+        "-pix_fmt", "yuv420p",  # Pixel format
+        "-shortest",  # Match video duration to audio
+        "-y",  # Overwrite output file if it exists
+        output_path  # Output file
+    ], duration=duration, on_progress=on_progress, is_disconnected=is_disconnected)
+    return output_path
+
+SOFT_SUBTITLE_CODECS = {
+    "mov_text": ("mp4", "mov_text"),  # MP4 timed-text track
+    "webvtt": ("mkv", "webvtt"),  # WebVTT track in Matroska
+}
+
+async def mux_subtitles_async(video_path, subtitle_path, output_path=None, subtitle_codec="mov_text",
+                              language="eng", is_disconnected=None):
+    """Add subtitles as a selectable track, copying the video and audio streams without re-encoding"""
+    container, codec = SOFT_SUBTITLE_CODECS[subtitle_codec]
+    if not output_path:
+        output_path = os.path.join(TEMP_DIR, f"soft_{os.path.splitext(os.path.basename(video_path))[0]}.{container}")
+
+    await run_ffmpeg([
+        "-i", video_path,  # Input video
+        "-i", subtitle_path,  # Input subtitles
+        "-map", "0:v", "-map", "0:a", "-map", "1:s",
+        "-c:v", "copy",  # Copy video without re-encoding
+        "-c:a", "copy",  # Copy audio without re-encoding
+        "-c:s", codec,  # Convert only the subtitle track
+        "-metadata:s:s:0", f"language={language}",
+        "-disposition:s:0", "default",
+        "-y",  # Overwrite output file if it exists
+        output_path  # Output video
+    ], is_disconnected=is_disconnected)
+    return output_path
+
+async def render_video_async(image_path, audio_path, add_subtitles=False, subtitle_mode="burn",
+                             on_progress=None, is_disconnected=None, workspace=None):
+    """
+    Render a video from an image and audio, optionally with subtitles from a transcription
+
+    subtitle_mode: "burn" renders subtitles into the picture in a single encode; "mov_text" (MP4)
+    and "webvtt" (MKV) mux them as a selectable track without re-encoding the video
+    workspace: where intermediate and result files are written; TEMP_DIR when not given
+
+    Returns:
+        (result file path, list of intermediate files the caller should delete, including the result)
+    """
+    from .speech_to_text import transcribe_audio_async
+    output_video = temp_path(".mp4", workspace)
+    temp_files = [output_video]
+    try:
+        if add_subtitles and subtitle_mode != "burn":
+            # Render the plain video while transcribing, then remux with a subtitle track
+            subtitle_format = "vtt" if subtitle_mode == "webvtt" else "srt"
+            srt_file = temp_path(f".{subtitle_format}", workspace, fast=True)
+            temp_files.append(srt_file)
+            tasks = [
+                asyncio.create_task(create_video_async(
+                    image_path, audio_path, output_video,
+                    on_progress=on_progress, is_disconnected=is_disconnected
+                )),
+                asyncio.create_task(
+                    transcribe_audio_async(audio_path, srt_file, subtitle_format=subtitle_format, workspace=workspace)
+                )
+            ]
+            try:
+                result_file, transcription = await asyncio.gather(*tasks)
+            except BaseException:
+                # Stop the encode (or transcription) still running before its files are removed
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            if transcription.words:
+                container = SOFT_SUBTITLE_CODECS[subtitle_mode][0]
+                output_with_subs = temp_path(f"_subtitled.{container}", workspace)
+                temp_files.append(output_with_subs)
+                result_file = await mux_subtitles_async(
+                    output_video, srt_file, output_with_subs, subtitle_mode,
+                    is_disconnected=is_disconnected
+                )
+            return result_file, temp_files
+
+        srt_file = None
+        if add_subtitles:
+            # Create SRT file
+            srt_file = temp_path(".srt", workspace, fast=True)
+            temp_files.append(srt_file)
+            transcription = await transcribe_audio_async(audio_path, srt_file, workspace=workspace)
+            if not transcription.words:
+                srt_file = None  # nothing was said, render without subtitles
+
+        if srt_file:
+            # Render image, audio and subtitles in a single encode
+            result_file = await create_video_with_subtitles_async(
+                image_path, audio_path, srt_file, output_video,
+                on_progress=on_progress, is_disconnected=is_disconnected
+            )
+        else:
+            result_file = await create_video_async(
+                image_path, audio_path, output_video,
+                on_progress=on_progress, is_disconnected=is_disconnected
+            )
+        return result_file, temp_files
+    except Exception:
+        remove_temp_files(temp_files)
+        raise
+
+async def render_scene_segment_async(image_path, audio_path, output_path, width=1280, height=720,
+                                     subtitle_path=None, is_disconnected=None):
+    """
+    Encode one slideshow scene with fixed resolution, frame rate and audio layout so that
+    segments from different source images can be joined with stream copy
+    """
+    video_filter = (
+        f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1"
+    )
+    if subtitle_path:
+        subtitle_path_abs = subtitle_path.replace('\\', '/')
+        video_filter += f",subtitles='{subtitle_path_abs}'"
+
+    await run_ffmpeg([
+        "-loop", "1",  # Loop the image
+        "-framerate", "25",
+        "-i", image_path,  # Input image
+        "-i", audio_path,  # Input audio
+        "-vf", video_filter,
+        "-c:v", "libx264",  # Video codec
+        "-tune", "stillimage",  # Optimize for still images
+        "-pix_fmt", "yuv420p",  # Pixel format
+        "-r", "25",
+        "-c:a", "aac",  # Audio codec
+        "-b:a", "192k",  # Audio bitrate
+        "-ar", "44100", "-ac", "2",  # Same audio layout in every segment
+        "-shortest",  # Match video duration to audio
+        "-y",  # Overwrite output file if it exists
+        output_path  # Output file
+    ], is_disconnected=is_disconnected)
+    return output_path
+
+async def concat_segments_async(segment_paths, output_path, is_disconnected=None, workspace=None):
+    """Join encoded segments with the concat demuxer, copying streams without re-encoding"""
+    list_file = temp_path("_concat.txt", workspace, fast=True)
+    try:
+        with open(list_file, "w", encoding="utf-8") as f:
+            for path in segment_paths:
+                escaped = os.path.abspath(path).replace('\\', '/').replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        await run_ffmpeg([
+            "-f", "concat", "-safe", "0",
+            "-i", list_file,
+            "-c", "copy",  # Stream copy, no re-encode
+            "-movflags", "+faststart",
+            "-y",
+            output_path
+        ], is_disconnected=is_disconnected)
+    finally:
+        remove_temp_files([list_file])
+    return output_path
+
+async def render_slideshow_async(scenes, width=1280, height=720, add_subtitles=False, is_disconnected=None,
+                                 workspace=None):
+    """
+    Render a multi-scene video: each (image, audio) scene is encoded as an independent segment in
+    parallel (bounded by the ffmpeg runner's concurrency limit), then the segments are concatenated.
+    Files are written to `workspace` when given, else TEMP_DIR.
+
+    Returns:
+        (result file path, list of intermediate files the caller should delete, including the result)
+    """
+    from .speech_to_text import transcribe_audio_async
+    output_path = temp_path("_slideshow.mp4", workspace)
+    temp_files = [output_path]
+
+    async def render_scene(image_path, audio_path):
+        segment_path = temp_path("_scene.mp4", workspace)
+        temp_files.append(segment_path)
+        srt_file = None
+        if add_subtitles:
+            srt_file = temp_path(".srt", workspace, fast=True)
+            temp_files.append(srt_file)
+            transcription = await transcribe_audio_async(audio_path, srt_file, workspace=workspace)
+            if not transcription.words:
+                srt_file = None
+        return await render_scene_segment_async(
+            image_path, audio_path, segment_path, width, height, srt_file, is_disconnected
+        )
+
+    tasks = [asyncio.create_task(render_scene(image, audio)) for image, audio in scenes]
+    try:
+        segments = await asyncio.gather(*tasks)
+        await concat_segments_async(segments, output_path, is_disconnected, workspace)
+        return output_path, temp_files
+    except BaseException:
+        # One failed scene fails the video, so stop the encodes still running
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        remove_temp_files(temp_files)
+        raise
+
+def remove_temp_files(paths):
+    """Delete temporary files, ignoring ones that are already gone"""
+    for path in paths:
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+            except Exception as e:
+                print(f"Error deleting temporary file {path}: {e}")
+
+async def _probe_duration_or_none(media_path):
+    try:
+        return await probe_duration(media_path)
+    except Exception as e:
+        print(f"Could not probe duration of {media_path}: {e}")
+        return None
+
 def upload_video_to_cloud(video_path, title=None, description=None):
     """Create video and upload to Cloudinary"""
     # Upload to Cloudinary
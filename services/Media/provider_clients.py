@@ -0,0 +1,110 @@
+import httpx
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from config import (
+    OPENROUTER_KEY, TOGETHER_KEY, GROQ_KEY, GEMINI_KEY,
+    PROVIDER_MAX_CONNECTIONS, PROVIDER_MAX_KEEPALIVE_CONNECTIONS,
+    PROVIDER_KEEPALIVE_EXPIRY, PROVIDER_TIMEOUT
+)
+
+# Process-wide registry of async provider clients, keyed by provider name
+_provider_clients: Dict[str, Any] = {}
+# aiohttp session shared by every Together request (see _create_provider_client)
+_together_session: Optional[Any] = None
+
+def _build_http_client() -> httpx.AsyncClient:
+    """Create an httpx client with a persistent keep-alive connection pool"""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=PROVIDER_MAX_CONNECTIONS,
+            max_keepalive_connections=PROVIDER_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=PROVIDER_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(PROVIDER_TIMEOUT)
+    )
+
+def _create_provider_client(name: str) -> Any:
+    if name == "openrouter":
+        from openai import AsyncOpenAI
+        return AsyncOpenAI(
+            base_url="https://openrouter.ai/api/v1",
+            api_key=OPENROUTER_KEY,
+            http_client=_build_http_client()
+        )
+    elif name == "gemini":
+        from google import genai
+        from google.genai import types
+        # genai keeps its own pool per client instance; async calls go through client.aio
+        return genai.Client(
+            api_key=GEMINI_KEY,
+            http_options=types.HttpOptions(timeout=int(PROVIDER_TIMEOUT * 1000))
+        )
+    elif name == "together":
+        import aiohttp
+        import together
+        from together import AsyncTogether
+        global _together_session
+        # AsyncTogether takes no http_client: it uses aiohttp and opens a new session (and TCP/TLS
+        # connection) per request unless the together.aiosession context variable holds one. A value
+        # set() in the lifespan task would not reach request tasks, so the shared keep-alive session
+        # is installed as the variable's default instead.
+        if _together_session is None or _together_session.closed:
+            _together_session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(
+                limit=PROVIDER_MAX_CONNECTIONS, keepalive_timeout=PROVIDER_KEEPALIVE_EXPIRY
+            ))
+        together.aiosession = ContextVar("aiohttp-session", default=_together_session)
+        return AsyncTogether(api_key=TOGETHER_KEY, timeout=PROVIDER_TIMEOUT)
+    elif name == "groq":
+        from groq import AsyncGroq
+        return AsyncGroq(api_key=GROQ_KEY, http_client=_build_http_client())
+    raise ValueError(f"Unknown provider: {name}")
+
+async def init_provider_clients():
+    """Create the shared async provider clients (called from the app lifespan)"""
+    for name in ("openrouter", "gemini", "together", "groq"):
+        if name in _provider_clients:
+            continue
+        try:
+            _provider_clients[name] = _create_provider_client(name)
+        except Exception as e:
+            print(f"Failed to create {name} client: {e}")
+
+def get_provider_client(name: str) -> Any:
+    """Get the shared async client for a provider, creating it on first use"""
+    client = _provider_clients.get(name)
+    if client is None:
+        client = _create_provider_client(name)
+        _provider_clients[name] = client
+    return client
+
+async def _close_client(client: Any):
+    if hasattr(client, "aio"):
+        # google-genai: close the async side, then the sync side
+        aclose: Optional[Any] = getattr(client.aio, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        close = getattr(client, "close", None)
+        if close is not None:
+            close()
+        return
+    close = getattr(client, "close", None)
+    if close is None:
+        return
+    result = close()
+    if hasattr(result, "__await__"):
+        await result
+
+async def close_provider_clients():
+    """Close all shared provider clients and their connection pools"""
+    global _together_session
+    while _provider_clients:
+        name, client = _provider_clients.popitem()
+        try:
+            await _close_client(client)
+        except Exception as e:
+            print(f"Error closing {name} client: {e}")
+    if _together_session is not None:
+        import together
+        together.aiosession = ContextVar("aiohttp-session", default=None)
+        await _together_session.close()
+        _together_session = None
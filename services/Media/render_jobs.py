@@ -0,0 +1,266 @@
+import asyncio
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+from config import render_job_collection, RENDER_JOB_DIR, RENDER_JOB_LEASE_SECONDS, RENDER_JOB_MAX_ATTEMPTS, \
+    RENDER_WORKER_POLL_SECONDS, RENDER_JOB_RETRY_BACKOFF_SECONDS, RENDER_WORKER_STOP_SECONDS
+from .media_utils import render_video_async, upload_media
+from .workspace import open_workspace
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+TERMINAL_JOB_STATUSES = (JOB_COMPLETED, JOB_FAILED)
+
+def new_render_job_dir() -> tuple[str, str]:
+    """Reserve a job ID and a directory for its input files"""
+    job_id = str(ObjectId())
+    directory = os.path.join(RENDER_JOB_DIR, job_id)
+    os.makedirs(directory, exist_ok=True)
+    return job_id, directory
+
+def remove_render_job_dir(job_id: str):
+    """Delete a job's directory with its input files"""
+    shutil.rmtree(os.path.join(RENDER_JOB_DIR, str(job_id)), ignore_errors=True)
+
+async def enqueue_render_job(job_id: str, user_id: str, image_path: str, audio_path: str,
+                             add_subtitles: bool = False, subtitle_mode: str = "burn") -> Dict:
+    """Queue a video render whose input files are already in the job directory"""
+    now = datetime.now()
+    job = {
+        "_id": ObjectId(job_id),
+        "user_id": ObjectId(user_id),
+        "status": JOB_QUEUED,
+        "image_path": image_path,
+        "audio_path": audio_path,
+        "add_subtitles": add_subtitles,
+        "subtitle_mode": subtitle_mode,
+        "attempts": 0,
+        "max_attempts": RENDER_JOB_MAX_ATTEMPTS,
+        "progress": None,
+        "result": None,
+        "error": None,
+        "worker_id": None,
+        "lease_expires_at": None,
+        "not_before": None,
+        "created_at": now,
+        "updated_at": now
+    }
+    await render_job_collection().insert_one(job)
+    return job
+
+async def get_render_job(job_id: str, user_id: str) -> Optional[Dict]:
+    try:
+        return await render_job_collection().find_one({"_id": ObjectId(job_id), "user_id": ObjectId(user_id)})
+    except Exception as e:
+        print(f"Error getting render job: {e}")
+        return None
+
+async def claim_render_job(worker_id: str) -> Optional[Dict]:
+    """
+    Lease the oldest queued job whose retry delay has passed, or a running job whose worker
+    stopped renewing its lease
+    """
+    now = datetime.now()
+    return await render_job_collection().find_one_and_update(
+        {
+            "$or": [
+                # $not/$gt also matches jobs without a not_before
+                {"status": JOB_QUEUED, "not_before": {"$not": {"$gt": now}}},
+                {"status": JOB_RUNNING, "lease_expires_at": {"$lt": now}, "$expr": {"$lt": ["$attempts", "$max_attempts"]}}
+            ]
+        },
+        {
+            "$set": {
+                "status": JOB_RUNNING,
+                "worker_id": worker_id,
+                "lease_expires_at": now + timedelta(seconds=RENDER_JOB_LEASE_SECONDS),
+                "updated_at": now
+            },
+            "$inc": {"attempts": 1}
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+async def fail_abandoned_render_jobs():
+    """Fail jobs whose lease expired after their last allowed attempt"""
+    now = datetime.now()
+    cursor = render_job_collection().find(
+        {"status": JOB_RUNNING, "lease_expires_at": {"$lt": now}, "$expr": {"$gte": ["$attempts", "$max_attempts"]}},
+        {"_id": 1}
+    )
+    async for job in cursor:
+        result = await render_job_collection().update_one(
+            {"_id": job["_id"], "status": JOB_RUNNING, "lease_expires_at": {"$lt": now}},
+            {"$set": {"status": JOB_FAILED, "error": "Worker stopped before finishing the render", "updated_at": now}}
+        )
+        if result.modified_count:
+            remove_render_job_dir(job["_id"])
+
+async def _update_owned_job(job_id, worker_id: str, fields: Dict) -> bool:
+    """Update a job only while this worker still holds its lease"""
+    fields["updated_at"] = datetime.now()
+    result = await render_job_collection().update_one(
+        {"_id": job_id, "status": JOB_RUNNING, "worker_id": worker_id},
+        {"$set": fields}
+    )
+    return result.matched_count > 0
+
+async def _release_render_job(job_id, worker_id: str):
+    """Put a job this worker is giving up on back in the queue without using up an attempt"""
+    await render_job_collection().update_one(
+        {"_id": job_id, "status": JOB_RUNNING, "worker_id": worker_id},
+        {
+            "$set": {"status": JOB_QUEUED, "worker_id": None, "lease_expires_at": None, "progress": None,
+                     "updated_at": datetime.now()},
+            "$inc": {"attempts": -1}
+        }
+    )
+
+async def process_render_job(job: Dict, worker_id: str, stop_event: Optional[asyncio.Event] = None):
+    """
+    Render, upload and record the result of one leased job
+
+    When stop_event is set during the render, ffmpeg is stopped and the job goes back to the
+    queue for another worker; an upload already under way is finished.
+    """
+    job_id = job["_id"]
+    state = {"progress": job.get("progress"), "lease_lost": False}
+    stop_event = stop_event or asyncio.Event()
+
+    def on_progress(progress):
+        if progress["percent"] is not None:
+            state["progress"] = progress["percent"]
+
+    async def renew_lease():
+        # Heartbeat: extend the lease and publish progress until the render finishes
+        while True:
+            await asyncio.sleep(max(1, RENDER_JOB_LEASE_SECONDS / 4))
+            owned = await _update_owned_job(job_id, worker_id, {
+                "progress": state["progress"],
+                "lease_expires_at": datetime.now() + timedelta(seconds=RENDER_JOB_LEASE_SECONDS)
+            })
+            if not owned:
+                state["lease_lost"] = True
+                return
+
+    async def should_stop():
+        return state["lease_lost"] or stop_event.is_set()
+
+    heartbeat = asyncio.create_task(renew_lease())
+    workspace = None
+    try:
+        workspace = await open_workspace("job-")
+        result_file, _ = await render_video_async(
+            job["image_path"], job["audio_path"], job.get("add_subtitles", False), job.get("subtitle_mode", "burn"),
+            on_progress=on_progress, is_disconnected=should_stop, workspace=workspace
+        )
+        upload = await upload_media(
+            file_path=result_file,
+            user_id=str(job["user_id"]),
+            folder="videos",
+            resource_type="video",
+            prompt="Rendered video",
+            metadata={"render_job_id": str(job_id)}
+        )
+        heartbeat.cancel()
+        await _update_owned_job(job_id, worker_id, {
+            "status": JOB_COMPLETED,
+            "progress": 100.0,
+            "result": {"media_id": upload["id"], "url": upload["url"]},
+            "error": None,
+            "lease_expires_at": None
+        })
+        remove_render_job_dir(job_id)
+    except Exception as e:
+        heartbeat.cancel()
+        if state["lease_lost"]:
+            print(f"Render job {job_id} was taken over by another worker")
+            return
+        if stop_event.is_set():
+            print(f"Render job {job_id} released: worker {worker_id} is stopping")
+            await _release_render_job(job_id, worker_id)
+            return
+        retry = job["attempts"] < job.get("max_attempts", RENDER_JOB_MAX_ATTEMPTS)
+        print(f"Render job {job_id} attempt {job['attempts']} failed: {e}")
+        # Exponential backoff, so a failing dependency is not hammered by immediate retries
+        delay = RENDER_JOB_RETRY_BACKOFF_SECONDS * 2 ** (job["attempts"] - 1)
+        await _update_owned_job(job_id, worker_id, {
+            "status": JOB_QUEUED if retry else JOB_FAILED,
+            "error": str(e),
+            "worker_id": None if retry else worker_id,
+            "lease_expires_at": None,
+            "not_before": datetime.now() + timedelta(seconds=delay) if retry else None
+        })
+        if not retry:
+            remove_render_job_dir(job_id)
+    finally:
+        if workspace is not None:
+            await workspace.close()
+
+async def run_render_worker(worker_id: Optional[str] = None, stop_event: Optional[asyncio.Event] = None):
+    """Poll the render queue and process jobs one at a time until stop_event is set"""
+    from .provider_clients import close_provider_clients
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    stop_event = stop_event or asyncio.Event()
+    print(f"Render worker {worker_id} started")
+    try:
+        while not stop_event.is_set():
+            try:
+                await fail_abandoned_render_jobs()
+                job = await claim_render_job(worker_id)
+            except Exception as e:
+                print(f"Error claiming render job: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=RENDER_WORKER_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await process_render_job(job, worker_id, stop_event)
+    finally:
+        await close_provider_clients()
+        print(f"Render worker {worker_id} stopped")
+
+def render_worker_main():
+    """Entry point of a render worker process; SIGTERM/SIGINT release the current job, then exit"""
+    async def main():
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+            except NotImplementedError:
+                pass  # Windows
+        await run_render_worker(stop_event=stop_event)
+    asyncio.run(main())
+
+def start_render_workers(count: int) -> List[multiprocessing.Process]:
+    """Start local render worker processes"""
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for _ in range(count):
+        process = context.Process(target=render_worker_main, daemon=True)
+        process.start()
+        processes.append(process)
+    return processes
+
+def stop_render_workers(processes: List[multiprocessing.Process], timeout: float = RENDER_WORKER_STOP_SECONDS):
+    """SIGTERM the workers so they release their jobs, killing any still running after `timeout`"""
+    for process in processes:
+        process.terminate()
+    deadline = time.monotonic() + timeout
+    for process in processes:
+        process.join(max(0, deadline - time.monotonic()))
+        if process.is_alive():
+            process.kill()
@@ -0,0 +1,47 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one shared provider call"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats = {"calls": 0, "executions": 0, "collapsed": 0}
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Retrieve the exception so it is not reported as unhandled when every waiter left
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: str, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        self.stats["calls"] += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats["executions"] += 1
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.stats["collapsed"] += 1
+        # Shield so one disconnecting client does not cancel the call for everyone else
+        return await asyncio.shield(task)
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "in_flight": len(self._inflight)}
+
+_single_flights: Dict[str, SingleFlight] = {}
+
+def get_single_flight(name: str) -> SingleFlight:
+    """Get the process-wide coalescing group for a kind of request"""
+    flight = _single_flights.get(name)
+    if flight is None:
+        flight = SingleFlight(name)
+        _single_flights[name] = flight
+    return flight
+
+def get_single_flight_stats() -> Dict:
+    """Per-group counts of calls, provider executions and collapsed duplicates"""
+    return {name: flight.get_stats() for name, flight in _single_flights.items()}
@@ -1,6 +1,18 @@
+import asyncio
+import hashlib
+import re
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
 from groq import Groq
+from .subtitles import write_subtitles
+from .ffmpeg_runner import run_ffmpeg_tool, probe_duration
+from .workspace import temp_path
 import os
-from config import GROQ_KEY
+from config import GROQ_KEY, TRANSCRIBE_LONG_AUDIO_SECONDS, TRANSCRIBE_CHUNK_SECONDS, \
+    TRANSCRIBE_CHUNK_OVERLAP_SECONDS, TRANSCRIBE_CONCURRENCY, TRANSCRIPTION_CACHE_TTL_SECONDS, \
+    transcription_cache_collection
+
+TRANSCRIBE_MODEL = "distil-whisper-large-v3-en"
 
 def transcribe_audio(audio_file, output_srt=None, language="en"):
     """Transcribe audio to text using Groq API and optionally create SRT file"""
@@ -22,53 +34,222 @@ def transcribe_audio(audio_file, output_srt=None, language="en"):
         
     return transcription
 
-def convert_to_srt(words, output_file):
-    """Convert word-level transcription data to SRT format"""
+async def transcribe_audio_async(audio_file, output_srt=None, language="en", long_audio=None, use_cache=True, subtitle_format="srt",
+                                 workspace=None):
+    """
+    Async variant of transcribe_audio using the shared Groq client
+
+    long_audio: True to split the file at silences and transcribe the pieces concurrently,
+    False to send it in one request, None to decide from the audio duration
+    use_cache: reuse a stored transcription of the same audio bytes, language and model
+    subtitle_format: format written to output_srt (srt, vtt or ass)
+    workspace: where long-audio pieces are written; TEMP_DIR when not given
+    """
+    audio_hash = None
+    if use_cache:
+        try:
+            audio_hash = await asyncio.to_thread(hash_audio_file, audio_file)
+            transcription = await _get_cached_transcription(audio_hash, language)
+        except Exception as e:
+            print(f"Error reading transcription cache: {e}")
+            transcription = None
+        if transcription is not None:
+            if output_srt and transcription.words:
+                await asyncio.to_thread(convert_to_srt, transcription.words, output_srt, subtitle_format)
+            return transcription
+
+    if long_audio is None:
+        try:
+            long_audio = await probe_duration(audio_file) > TRANSCRIBE_LONG_AUDIO_SECONDS
+        except Exception as e:
+            print(f"Could not probe audio duration: {e}")
+            long_audio = False
+
+    if long_audio:
+        transcription = await transcribe_long_audio(audio_file, language, workspace)
+    else:
+        transcription = await _transcribe_file(audio_file, language)
+
+    if audio_hash:
+        await _store_transcription(audio_hash, language, transcription)
+
+    if output_srt and transcription.words:
+        await asyncio.to_thread(convert_to_srt, transcription.words, output_srt, subtitle_format)
+
+    return transcription
+
+async def _transcribe_file(audio_file, language="en"):
+    from .provider_clients import get_provider_client
+    client = get_provider_client("groq")
+
+    def read_file():
+        with open(audio_file, "rb") as file:
+            return file.read()
+
+    audio_bytes = await asyncio.to_thread(read_file)
+    return await client.audio.transcriptions.create(
+        file=(os.path.basename(audio_file), audio_bytes),
+        model=TRANSCRIBE_MODEL,
+        response_format="verbose_json",
+        timestamp_granularities=["word", "segment"],
+        language=language,
+        temperature=0.0
+    )
+
+async def detect_silences(audio_file, noise_db=-30, min_silence=0.4):
+    """Return (start, end) pairs of silent stretches found by ffmpeg silencedetect"""
+    _, stderr = await run_ffmpeg_tool([
+        "ffmpeg", "-hide_banner", "-nostats",
+        "-i", audio_file,
+        "-af", f"silencedetect=noise={noise_db}dB:d={min_silence}",
+        "-f", "null", "-"
+    ])
+    starts = [float(x) for x in re.findall(r"silence_start: (-?[\d.]+)", stderr)]
+    ends = [float(x) for x in re.findall(r"silence_end: (-?[\d.]+)", stderr)]
+    return list(zip(starts, ends))
+
+def choose_cut_points(duration, silences, chunk_seconds):
+    """Pick cut points near every chunk_seconds, snapped to the middle of a nearby silence"""
+    window = chunk_seconds / 4
+    midpoints = [(start + end) / 2 for start, end in silences]
+    cuts = []
+    target = chunk_seconds
+    while target < duration - window:
+        nearby = [m for m in midpoints if abs(m - target) <= window and (not cuts or m > cuts[-1])]
+        cut = min(nearby, key=lambda m: abs(m - target)) if nearby else target
+        cuts.append(cut)
+        target = cut + chunk_seconds
+    return cuts
+
+async def _extract_segment(audio_file, start, end, output_file):
+    # 16 kHz mono FLAC keeps uploads small without hurting Whisper accuracy
+    await run_ffmpeg_tool([
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}",
+        "-i", audio_file,
+        "-ac", "1", "-ar", "16000", "-c:a", "flac",
+        "-y", output_file
+    ])
+    return output_file
+
+def _as_dict(item):
+    if isinstance(item, dict):
+        return item
+    if hasattr(item, "model_dump"):
+        return item.model_dump()
+    return dict(vars(item))
+
+async def transcribe_long_audio(audio_file, language="en", workspace=None):
+    """
+    Split audio at silences into overlapping pieces, transcribe them concurrently and
+    merge the words and segments back onto the original timeline
+    """
+    duration = await probe_duration(audio_file)
+    silences = await detect_silences(audio_file)
+    cuts = choose_cut_points(duration, silences, TRANSCRIBE_CHUNK_SECONDS)
+    bounds = list(zip([0.0] + cuts, cuts + [duration]))
+
+    semaphore = asyncio.Semaphore(TRANSCRIBE_CONCURRENCY)
+    temp_files = []
+
+    async def transcribe_piece(start, end):
+        # Pad each piece so words cut at the boundary are heard whole by one side
+        piece_start = max(0.0, start - TRANSCRIBE_CHUNK_OVERLAP_SECONDS)
+        piece_end = min(duration, end + TRANSCRIBE_CHUNK_OVERLAP_SECONDS)
+        piece_file = temp_path(".flac", workspace)
+        temp_files.append(piece_file)
+        async with semaphore:
+            await _extract_segment(audio_file, piece_start, piece_end, piece_file)
+            return piece_start, await _transcribe_file(piece_file, language)
+
+    tasks = [asyncio.create_task(transcribe_piece(start, end)) for start, end in bounds]
+    try:
+        pieces = await asyncio.gather(*tasks)
+    except BaseException:
+        # Stop the extracts and requests still running before their piece files are removed
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        for f in temp_files:
+            if os.path.exists(f):
+                os.remove(f)
+
+    words, segments = [], []
+    for (start, end), (offset, transcription) in zip(bounds, pieces):
+        # Keep only items that begin inside this piece's own span, dropping the overlap
+        for word in getattr(transcription, "words", None) or []:
+            word = _as_dict(word)
+            word_start = word["start"] + offset
+            if start <= word_start < end:
+                words.append({**word, "start": word_start, "end": word["end"] + offset})
+        for segment in getattr(transcription, "segments", None) or []:
+            segment = _as_dict(segment)
+            segment_start = segment["start"] + offset
+            if start <= segment_start < end:
+                segments.append({**segment, "id": len(segments), "start": segment_start, "end": segment["end"] + offset})
+
+    return SimpleNamespace(
+        text=" ".join(segment["text"].strip() for segment in segments),
+        words=words,
+        segments=segments,
+        language=language,
+        duration=duration
+    )
+
+def hash_audio_file(audio_file, block_size=1024 * 1024) -> str:
+    """SHA-256 of the audio bytes, read in blocks"""
+    digest = hashlib.sha256()
+    with open(audio_file, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _transcription_cache_id(audio_hash, language):
+    return f"{audio_hash}:{language}:{TRANSCRIBE_MODEL}"
+
+async def _get_cached_transcription(audio_hash, language):
+    cached = await transcription_cache_collection().find_one(
+        {"_id": _transcription_cache_id(audio_hash, language), "expires_at": {"$gt": datetime.now(timezone.utc)}}
+    )
+    if not cached:
+        return None
+    return SimpleNamespace(
+        text=cached["text"],
+        words=cached.get("words") or [],
+        segments=cached.get("segments") or [],
+        language=cached.get("language", language),
+        duration=cached.get("duration")
+    )
+
+async def _store_transcription(audio_hash, language, transcription):
+    try:
+        # UTC: the TTL monitor compares expires_at with UTC, not the server's local time
+        now = datetime.now(timezone.utc)
+        await transcription_cache_collection().replace_one(
+            {"_id": _transcription_cache_id(audio_hash, language)},
+            {
+                "_id": _transcription_cache_id(audio_hash, language),
+                "audio_sha256": audio_hash,
+                "language": language,
+                "model": TRANSCRIBE_MODEL,
+                "text": transcription.text,
+                "words": [_as_dict(w) for w in getattr(transcription, "words", None) or []],
+                "segments": [_as_dict(s) for s in getattr(transcription, "segments", None) or []],
+                "duration": getattr(transcription, "duration", None),
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=TRANSCRIPTION_CACHE_TTL_SECONDS)
+            },
+            upsert=True
+        )
+    except Exception as e:
+        print(f"Error writing transcription cache: {e}")
+
+def convert_to_srt(words, output_file, subtitle_format="srt", **cue_options):
+    """Convert word-level transcription data to a subtitle file (SRT by default, or vtt/ass)"""
     if not words:
         print("No words data provided")
         return
-        
-    # Group words into subtitle segments
-    segments = []
-    current_segment = []
-    word_count = 0
-    
-    for word_data in words:
-        current_segment.append(word_data)
-        word_count += 1
-        
-        if word_count == 5:  # Group by 5 words per segment
-            segments.append(current_segment)
-            current_segment = []
-            word_count = 0
-            
-    # Add any remaining words
-    if current_segment:
-        segments.append(current_segment)
-    
-    # Format time as HH:MM:SS,mmm
-    def format_time(seconds):
-        ms = int((seconds % 1) * 1000)
-        s = int(seconds) % 60
-        m = int(seconds / 60) % 60
-        h = int(seconds / 3600)
-        return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
-    
-    # Generate SRT content
-    srt_content = ""
-    for i, segment in enumerate(segments, 1):
-        if not segment:
-            continue
-            
-        start_time = segment[0]['start']
-        end_time = segment[-1]['end']
-        text = " ".join(item['word'] for item in segment)
-        
-        srt_entry = f"{i}\n{format_time(start_time)} --> {format_time(end_time)}\n{text}\n\n"
-        srt_content += srt_entry
-    
-    # Write to file
-    with open(output_file, "w") as f:
-        f.write(srt_content)
-    
-    return output_file
\ No newline at end of file
+
+    return write_subtitles(words, output_file, subtitle_format, **cue_options)
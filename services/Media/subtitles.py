@@ -0,0 +1,123 @@
+from typing import Iterable, Iterator, Tuple
+
+# Default cue limits, roughly following common broadcast subtitle guidelines
+MAX_CUE_DURATION = 5.0
+MAX_CUE_CHARS = 42
+MAX_PAUSE_GAP = 0.6
+SENTENCE_ENDINGS = (".", "!", "?", "…")
+
+Cue = Tuple[float, float, str]
+
+def _word_fields(word) -> Tuple[float, float, str]:
+    if isinstance(word, dict):
+        return word["start"], word["end"], word["word"]
+    return word.start, word.end, word.word
+
+def iter_cues(words: Iterable, max_duration: float = MAX_CUE_DURATION, max_chars: int = MAX_CUE_CHARS,
+              max_gap: float = MAX_PAUSE_GAP) -> Iterator[Cue]:
+    """
+    Group timed words into subtitle cues
+
+    A new cue starts when adding the next word would exceed max_duration or max_chars,
+    when the pause before it is at least max_gap, or after a sentence-ending word.
+    """
+    cue_start = cue_end = None
+    parts = []
+    length = 0
+    for word in words:
+        start, end, text = _word_fields(word)
+        text = text.strip()
+        if not text:
+            continue
+        if parts and (
+            start - cue_end >= max_gap
+            or end - cue_start > max_duration
+            or length + 1 + len(text) > max_chars
+            or parts[-1].endswith(SENTENCE_ENDINGS)
+        ):
+            yield cue_start, cue_end, " ".join(parts)
+            parts = []
+        if not parts:
+            cue_start = start
+            length = len(text)
+        else:
+            length += 1 + len(text)
+        parts.append(text)
+        cue_end = max(end, start)
+    if parts:
+        yield cue_start, cue_end, " ".join(parts)
+
+def _split_ms(seconds: float) -> Tuple[int, int, int, int]:
+    total_ms = max(0, int(round(seconds * 1000)))
+    h, rest = divmod(total_ms, 3600000)
+    m, rest = divmod(rest, 60000)
+    s, ms = divmod(rest, 1000)
+    return h, m, s, ms
+
+def format_srt_time(seconds: float) -> str:
+    h, m, s, ms = _split_ms(seconds)
+    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+def format_vtt_time(seconds: float) -> str:
+    h, m, s, ms = _split_ms(seconds)
+    return f"{h:02d}:{m:02d}:{s:02d}.{ms:03d}"
+
+def format_ass_time(seconds: float) -> str:
+    h, m, s, ms = _split_ms(seconds)
+    return f"{h:d}:{m:02d}:{s:02d}.{ms // 10:02d}"
+
+def iter_srt(cues: Iterable[Cue]) -> Iterator[str]:
+    for i, (start, end, text) in enumerate(cues, 1):
+        yield f"{i}\n{format_srt_time(start)} --> {format_srt_time(end)}\n{text}\n\n"
+
+def iter_vtt(cues: Iterable[Cue]) -> Iterator[str]:
+    yield "WEBVTT\n\n"
+    for start, end, text in cues:
+        yield f"{format_vtt_time(start)} --> {format_vtt_time(end)}\n{text}\n\n"
+
+ASS_HEADER = (
+    "[Script Info]\n"
+    "ScriptType: v4.00+\n"
+    "PlayResX: 1280\n"
+    "PlayResY: 720\n"
+    "WrapStyle: 0\n"
+    "\n"
+    "[V4+ Styles]\n"
+    "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+    "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+    "Alignment, MarginL, MarginR, MarginV, Encoding\n"
+    "Style: Default,Arial,48,&H00FFFFFF,&H000000FF,&H00000000,&H80000000,"
+    "0,0,0,0,100,100,0,0,1,2,1,2,40,40,40,1\n"
+    "\n"
+    "[Events]\n"
+    "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+)
+
+def iter_ass(cues: Iterable[Cue]) -> Iterator[str]:
+    yield ASS_HEADER
+    for start, end, text in cues:
+        # Braces start override tags in ASS, so they cannot appear in plain text
+        text = text.replace("{", "(").replace("}", ")").replace("\n", "\\N")
+        yield f"Dialogue: 0,{format_ass_time(start)},{format_ass_time(end)},Default,,0,0,0,,{text}\n"
+
+SUBTITLE_WRITERS = {
+    "srt": iter_srt,
+    "vtt": iter_vtt,
+    "ass": iter_ass,
+}
+
+def write_subtitles(words: Iterable, output_file: str, subtitle_format: str = "srt", **cue_options) -> str:
+    """Stream cues built from timed words straight into a subtitle file"""
+    writer = SUBTITLE_WRITERS.get(subtitle_format)
+    if writer is None:
+        raise ValueError(f"Unsupported subtitle format: {subtitle_format}")
+    with open(output_file, "w", encoding="utf-8", newline="\n") as f:
+        f.writelines(writer(iter_cues(words, **cue_options)))
+    return output_file
+
+def get_subtitle_media_type(subtitle_format: str) -> str:
+    return {
+        "srt": "application/x-subrip",
+        "vtt": "text/vtt",
+        "ass": "text/x-ssa",
+    }[subtitle_format]
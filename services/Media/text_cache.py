@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict
+from config import text_cache_collection, TEXT_CACHE_TTL_SECONDS, TEXT_CACHE_MAX_ENTRIES
+from .cache_utils import TTLCache, make_cache_key
+from .text_generation import generate_text_async
+from .single_flight import get_single_flight
+
+# First tier: per-process LRU; second tier: MongoDB collection shared across workers
+_memory_cache = TTLCache(TEXT_CACHE_MAX_ENTRIES, TEXT_CACHE_TTL_SECONDS)
+_text_cache_stats = {"memory_hits": 0, "mongo_hits": 0, "misses": 0, "bypassed": 0}
+
+async def generate_text_cached(model, prompt, max_length=None, use_cache=True):
+    """Generate text, serving identical (model, prompt, max_length) requests from cache"""
+    if not use_cache:
+        _text_cache_stats["bypassed"] += 1
+        return await generate_text_async(model, prompt, max_length)
+
+    key = make_cache_key("text", model, prompt.strip(), max_length)
+    text = _memory_cache.get(key)
+    if text is not None:
+        _text_cache_stats["memory_hits"] += 1
+        return text
+
+    # Concurrent identical misses share one Mongo lookup and provider call
+    return await get_single_flight("text").do(key, _load_or_generate_text, key, model, prompt, max_length)
+
+async def _load_or_generate_text(key, model, prompt, max_length):
+    try:
+        cached = await text_cache_collection().find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}}
+        )
+    except Exception as e:
+        print(f"Error reading text cache: {e}")
+        cached = None
+    if cached:
+        _text_cache_stats["mongo_hits"] += 1
+        # The client is not tz_aware, so stored UTC times come back naive
+        remaining = (cached["expires_at"].replace(tzinfo=timezone.utc) - datetime.now(timezone.utc)).total_seconds()
+        _memory_cache.set(key, cached["text"], max(remaining, 0))
+        return cached["text"]
+
+    _text_cache_stats["misses"] += 1
+    text = await generate_text_async(model, prompt, max_length)
+    if text:
+        _memory_cache.set(key, text)
+        try:
+            # UTC: the TTL monitor compares expires_at with UTC, not the server's local time
+            now = datetime.now(timezone.utc)
+            await text_cache_collection().replace_one(
+                {"_id": key},
+                {
+                    "_id": key,
+                    "model": model,
+                    "max_length": max_length,
+                    "text": text,
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=TEXT_CACHE_TTL_SECONDS)
+                },
+                upsert=True
+            )
+        except Exception as e:
+            print(f"Error writing text cache: {e}")
+    return text
+
+def get_text_cache_stats() -> Dict:
+    """Hit/miss counters for this worker's text cache"""
+    lookups = _text_cache_stats["memory_hits"] + _text_cache_stats["mongo_hits"] + _text_cache_stats["misses"]
+    hits = lookups - _text_cache_stats["misses"]
+    return {
+        **_text_cache_stats,
+        "memory_entries": len(_memory_cache),
+        "hit_ratio": round(hits / lookups, 4) if lookups else 0.0
+    }
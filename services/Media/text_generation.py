@@ -45,3 +45,98 @@ def generate_text(model, prompt, max_length=None):
             )       
         )
         return response.text
+
+async def generate_text_async(model, prompt, max_length=None):
+    """Async variant of generate_text using the shared provider clients"""
+    from .provider_clients import get_provider_client
+    if (model=="deepseek"):
+        client = get_provider_client("openrouter")
+
+        completion = await client.chat.completions.create(
+            extra_body={},
+            model="deepseek/deepseek-prover-v2:free",
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": prompt,
+                        },
+                    ]    
+                }
+            ],
+            max_tokens=max_length
+        )
+        return completion.choices[0].message.content
+
+    elif (model=="gemini"):
+        from google.genai import types
+
+        client = get_provider_client("gemini")
+
+        response = await client.aio.models.generate_content(
+            model="gemini-2.0-flash",
+            contents=[prompt],
+            config=types.GenerateContentConfig(
+                max_output_tokens=max_length
+            )
+        )
+        return response.text
+
+async def stream_text_async(model, prompt, max_length=None, usage=None):
+    """
+    Yield generated text chunks as they arrive from the provider
+
+    usage: optional dict, filled with the provider's prompt_tokens and completion_tokens
+    once the stream has finished
+    """
+    from .provider_clients import get_provider_client
+    if (model=="deepseek"):
+        client = get_provider_client("openrouter")
+
+        stream = await client.chat.completions.create(
+            extra_body={},
+            model="deepseek/deepseek-prover-v2:free",
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": prompt,
+                        },
+                    ]    
+                }
+            ],
+            max_tokens=max_length,
+            stream=True,
+            # The final chunk carries token usage for the whole completion (and no choices)
+            stream_options={"include_usage": True}
+        )
+        async for chunk in stream:
+            if chunk.usage is not None and usage is not None:
+                usage["prompt_tokens"] = chunk.usage.prompt_tokens
+                usage["completion_tokens"] = chunk.usage.completion_tokens
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    elif (model=="gemini"):
+        from google.genai import types
+
+        client = get_provider_client("gemini")
+
+        stream = await client.aio.models.generate_content_stream(
+            model="gemini-2.0-flash",
+            contents=[prompt],
+            config=types.GenerateContentConfig(
+                max_output_tokens=max_length
+            )
+        )
+        async for chunk in stream:
+            # Usage metadata is cumulative; the last chunk has the final counts
+            if chunk.usage_metadata is not None and usage is not None:
+                usage["prompt_tokens"] = chunk.usage_metadata.prompt_token_count
+                usage["completion_tokens"] = chunk.usage_metadata.candidates_token_count
+            if chunk.text:
+                yield chunk.text
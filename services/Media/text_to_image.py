@@ -1,3 +1,5 @@
+import os
+
 def generate_image(model, prompt, output_file="image.png", width=1024, height=768):
     if model == "flux":
         import base64
@@ -52,4 +54,96 @@ def generate_image(model, prompt, output_file="image.png", width=1024, height=76
                 # Save the image to the current path with the name "image.png"
                 image.save(output_file)
                 
-                return output_file
\ No newline at end of file
+                return output_file
+
+IMAGE_FORMATS = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+    "gif": "image/gif",
+}
+
+def detect_image_format(image_data: bytes) -> str:
+    """Image format from the file signature: png, jpeg, webp or gif"""
+    if image_data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    if image_data[:3] == b"\xff\xd8\xff":
+        return "jpeg"
+    if image_data[:4] == b"RIFF" and image_data[8:12] == b"WEBP":
+        return "webp"
+    if image_data[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    raise ValueError("Unrecognized image format")
+
+def transcode_image(image_data: bytes, output_format=None, size=None) -> bytes:
+    """
+    Re-encode only when a different format or size is requested; otherwise return the bytes as-is
+    """
+    source_format = detect_image_format(image_data)
+    output_format = output_format or source_format
+    if output_format == source_format and not size:
+        return image_data
+
+    from PIL import Image
+    from io import BytesIO
+    image = Image.open(BytesIO(image_data))
+    if size:
+        image = image.resize(size, Image.LANCZOS)
+    if output_format == "jpeg" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    output = BytesIO()
+    image.save(output, format=output_format.upper())
+    return output.getvalue()
+
+async def generate_image_bytes_async(model, prompt, width=1024, height=768) -> bytes:
+    """Generate an image and return the provider's encoded bytes without decoding them"""
+    import base64
+    from .provider_clients import get_provider_client
+
+    if model == "flux":
+        client = get_provider_client("together")
+
+        response = await client.images.generate(
+            prompt=prompt,
+            model="black-forest-labs/FLUX.1-schnell-Free",
+            width=width,
+            height=height,
+            steps=4,
+            n=1,
+            response_format="b64_json",
+        )
+        return base64.b64decode(response.data[0].b64_json)
+    elif model == "gemini":
+        from google.genai import types
+
+        client = get_provider_client("gemini")
+
+        response = await client.aio.models.generate_content(
+            model="gemini-2.0-flash-preview-image-generation",
+            contents=prompt,
+            config=types.GenerateContentConfig(
+            response_modalities=['TEXT', 'IMAGE']
+            )
+        )
+
+        for part in response.candidates[0].content.parts:
+            if part.inline_data is not None:
+                return part.inline_data.data
+        raise Exception("No image returned by the provider")
+    raise ValueError(f"Unsupported image model: {model}")
+
+async def generate_image_async(model, prompt, output_file="image.png", width=1024, height=768):
+    """Async variant of generate_image; converts only if output_file's extension needs another format"""
+    import asyncio
+    image_data = await generate_image_bytes_async(model, prompt, width, height)
+    ext = os.path.splitext(output_file)[1].lower().lstrip(".")
+    output_format = {"jpg": "jpeg"}.get(ext, ext)
+    if output_format in IMAGE_FORMATS:
+        image_data = await asyncio.to_thread(transcode_image, image_data, output_format)
+
+    def write_file():
+        with open(output_file, "wb") as f:
+            f.write(image_data)
+
+    await asyncio.to_thread(write_file)
+    return output_file
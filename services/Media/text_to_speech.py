@@ -1,6 +1,11 @@
 from groq import Groq
-from config import GROQ_KEY
+from config import GROQ_KEY, TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES
 import os
+import re
+import struct
+import asyncio
+from .cache_utils import ContentStore, make_cache_key
+from .single_flight import get_single_flight
 
 def generate_speech(text, output_file="speech.wav", voice="Fritz-PlayAI"):
     """Generate speech from text using Groq API"""
@@ -17,4 +22,155 @@ def generate_speech(text, output_file="speech.wav", voice="Fritz-PlayAI"):
     )
     
     response.write_to_file(output_file)
-    return output_file
\ No newline at end of file
+    return output_file
+
+async def generate_speech_async(text, output_file="speech.wav", voice="Fritz-PlayAI"):
+    """Async variant of generate_speech using the phrase cache and the shared Groq client"""
+    audio_bytes = await generate_speech_bytes(text, voice)
+
+    def write_file():
+        with open(output_file, "wb") as f:
+            f.write(audio_bytes)
+
+    await asyncio.to_thread(write_file)
+    return output_file
+
+# Synthesized audio stored under a hash of (normalized text, voice)
+tts_store = ContentStore(TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES)
+_tts_cache_stats = {"hits": 0, "misses": 0}
+
+async def generate_speech_bytes(text, voice="Fritz-PlayAI"):
+    """Synthesize speech and return the WAV bytes, serving repeated phrases from the cache"""
+    key = make_cache_key("tts", " ".join(text.split()), voice)
+    cached_file = tts_store.get(key, "wav")
+    if cached_file:
+        try:
+            data = await asyncio.to_thread(_read_file, cached_file)
+            _tts_cache_stats["hits"] += 1
+            return data
+        except FileNotFoundError:
+            pass  # evicted between lookup and read
+    _tts_cache_stats["misses"] += 1
+    # Identical concurrent misses share one Groq call
+    return await get_single_flight("tts").do(key, _synthesize_and_store, key, text, voice)
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+async def _synthesize_and_store(key, text, voice):
+    audio_bytes = await _synthesize_speech_bytes(text, voice)
+    try:
+        await asyncio.to_thread(tts_store.put_bytes, key, audio_bytes, "wav")
+    except Exception as e:
+        print(f"Error writing TTS cache: {e}")
+    return audio_bytes
+
+def get_tts_cache_stats():
+    """Hit/miss counters and disk usage for the TTS phrase cache"""
+    return {
+        **_tts_cache_stats,
+        "bytes": tts_store.total_bytes(),
+        "max_bytes": tts_store.max_bytes
+    }
+
+async def _synthesize_speech_bytes(text, voice):
+    from .provider_clients import get_provider_client
+    client = get_provider_client("groq")
+
+    response = await client.audio.speech.create(
+        model="playai-tts",
+        voice=voice,
+        input=text,
+        response_format="wav"
+    )
+    return await response.read()
+
+def split_text_for_tts(text, max_chars=None):
+    """Split text at sentence boundaries into chunks of at most max_chars characters"""
+    from config import TTS_CHUNK_MAX_CHARS
+    max_chars = max_chars or TTS_CHUNK_MAX_CHARS
+    sentences = [s for s in re.split(r"(?<=[.!?…])\s+", " ".join(text.split())) if s]
+
+    # Sentences longer than the limit are cut at the last space that fits
+    pieces = []
+    for sentence in sentences:
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if sentence:
+            pieces.append(sentence)
+
+    # Merge short sentences so each request carries a reasonable amount of text
+    chunks = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) + 1 + len(piece) <= max_chars:
+            chunks[-1] = f"{chunks[-1]} {piece}"
+        else:
+            chunks.append(piece)
+    return chunks
+
+def read_wav_pcm(data: bytes):
+    """Return ((channels, sample_rate, bits_per_sample), pcm bytes) from a WAV file"""
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("Not a WAV file")
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset + 4]
+        chunk_size = struct.unpack("<I", data[offset + 4:offset + 8])[0]
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            _, channels, sample_rate, _, _, bits = struct.unpack("<HHIIHH", data[body:body + 16])
+            fmt = (channels, sample_rate, bits)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk before fmt chunk")
+            # Streamed WAVs may declare an unknown (0xFFFFFFFF) data size
+            return fmt, data[body:min(body + chunk_size, len(data))]
+        offset = body + chunk_size + (chunk_size % 2)
+    raise ValueError("WAV file has no data chunk")
+
+def wav_header(channels, sample_rate, bits, data_size=0xFFFFFFFF - 36):
+    """PCM WAV header; the default size marks a stream of unknown length"""
+    block_align = channels * bits // 8
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", min(data_size + 36, 0xFFFFFFFF), b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, sample_rate * block_align, block_align, bits,
+        b"data", data_size
+    )
+
+async def stream_speech_chunks(chunks, voice="Fritz-PlayAI"):
+    """
+    Synthesize text chunks concurrently and yield one WAV stream in order
+
+    The header is yielded with the first chunk's PCM, so playback can start
+    while later chunks are still being synthesized.
+    """
+    from config import TTS_CHUNK_CONCURRENCY
+    semaphore = asyncio.Semaphore(TTS_CHUNK_CONCURRENCY)
+
+    async def synthesize(chunk):
+        async with semaphore:
+            return await generate_speech_bytes(chunk, voice)
+
+    tasks = [asyncio.create_task(synthesize(chunk)) for chunk in chunks]
+    try:
+        stream_fmt = None
+        for task in tasks:
+            fmt, pcm = read_wav_pcm(await task)
+            if stream_fmt is None:
+                stream_fmt = fmt
+                yield wav_header(*fmt) + pcm
+            elif fmt != stream_fmt:
+                raise ValueError(f"TTS chunk format {fmt} does not match {stream_fmt}")
+            else:
+                yield pcm
+    finally:
+        # Stop outstanding synthesis if the client disconnected or a chunk failed
+        for task in tasks:
+            task.cancel()
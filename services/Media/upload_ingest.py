@@ -0,0 +1,91 @@
+import asyncio
+import os
+import time
+from typing import Dict, Optional
+from config import UPLOAD_CHUNK_BYTES
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+class UploadTooLargeError(Exception):
+    """An uploaded file is larger than the limit for its type"""
+
+_ingest_stats = {"uploads": 0, "bytes": 0, "seconds": 0.0, "rejected": 0, "peak_buffer_bytes": 0}
+
+def _max_rss_bytes() -> Optional[int]:
+    """High-water resident memory of this process"""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def _copy_upload(source, destination: str, limit: Optional[int], chunk_size: int, name: str):
+    """Copy a file object to disk one fixed-size chunk at a time; returns (bytes, largest chunk held)"""
+    source.seek(0)
+    total = 0
+    peak_buffer = 0
+    with open(destination, "wb") as out:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            total += len(chunk)
+            peak_buffer = max(peak_buffer, len(chunk))
+            if limit is not None and total > limit:
+                raise UploadTooLargeError(f"{name} is larger than {limit} bytes")
+            out.write(chunk)
+    return total, peak_buffer
+
+async def save_upload(upload, destination: str, limit: Optional[int] = None,
+                      chunk_size: int = UPLOAD_CHUNK_BYTES) -> Dict:
+    """
+    Stream an UploadFile to `destination` without reading it into memory
+
+    Starlette spools large multipart parts to a temp file; this copies from it in `chunk_size`
+    pieces inside one worker thread, so at most one chunk per upload is held in memory.
+
+    Returns:
+        Per-request ingest stats: bytes, seconds, peak_buffer_bytes and the process max_rss_bytes
+    """
+    name = upload.filename or "Upload"
+    if limit is not None and upload.size is not None and upload.size > limit:
+        _ingest_stats["rejected"] += 1
+        raise UploadTooLargeError(f"{name} is larger than {limit} bytes")
+
+    start = time.perf_counter()
+    try:
+        total, peak_buffer = await asyncio.to_thread(_copy_upload, upload.file, destination, limit, chunk_size, name)
+    except UploadTooLargeError:
+        _ingest_stats["rejected"] += 1
+        if os.path.exists(destination):
+            os.remove(destination)
+        raise
+    elapsed = time.perf_counter() - start
+
+    _ingest_stats["uploads"] += 1
+    _ingest_stats["bytes"] += total
+    _ingest_stats["seconds"] += elapsed
+    _ingest_stats["peak_buffer_bytes"] = max(_ingest_stats["peak_buffer_bytes"], peak_buffer)
+    stats = {
+        "filename": upload.filename,
+        "bytes": total,
+        "seconds": round(elapsed, 4),
+        "peak_buffer_bytes": peak_buffer,
+        "max_rss_bytes": _max_rss_bytes()
+    }
+    print(f"Ingested {upload.filename}: {total} bytes in {elapsed:.3f}s, "
+          f"peak buffer {peak_buffer} bytes, process max RSS {stats['max_rss_bytes']}")
+    return stats
+
+def get_ingest_stats() -> Dict:
+    """Upload ingestion counters for this worker"""
+    seconds = _ingest_stats["seconds"]
+    return {
+        **_ingest_stats,
+        "seconds": round(seconds, 4),
+        "chunk_bytes": UPLOAD_CHUNK_BYTES,
+        "bytes_per_second": round(_ingest_stats["bytes"] / seconds) if seconds > 0 else None,
+        "max_rss_bytes": _max_rss_bytes()
+    }
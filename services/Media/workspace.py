@@ -0,0 +1,274 @@
+import asyncio
+import os
+try:
+    import fcntl
+except ImportError:  # Windows: the janitor falls back to the age cutoff alone
+    fcntl = None
+import shutil
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Set
+from uuid import uuid4
+from config import TEMP_DIR, WORKSPACE_DIR, WORKSPACE_FAST_DIR, WORKSPACE_QUOTA_BYTES, WORKSPACE_QUOTA_WAIT_SECONDS, \
+    WORKSPACE_MAX_AGE_SECONDS, WORKSPACE_JANITOR_INTERVAL_SECONDS, IMAGE_CACHE_DIR, TTS_CACHE_DIR, RENDER_JOB_DIR
+
+class WorkspaceQuotaError(Exception):
+    """A workspace reservation could not fit in the temp disk quota in time"""
+
+class ByteQuota:
+    """
+    Byte budget shared by every workspace in the process; reservations wait for space to free up
+
+    The budget is per process, not per host: API and render worker processes each hold their own.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.reserved = 0
+        self.stats = {"reservations": 0, "waited": 0, "rejected": 0, "peak_reserved": 0}
+        self._condition: Optional[asyncio.Condition] = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Created lazily inside the running event loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self, nbytes: int, timeout: Optional[float] = WORKSPACE_QUOTA_WAIT_SECONDS):
+        if nbytes > self.limit:
+            self.stats["rejected"] += 1
+            raise WorkspaceQuotaError(f"{nbytes} bytes exceeds the temp disk quota of {self.limit} bytes")
+        condition = self._get_condition()
+        async with condition:
+            if self.reserved + nbytes > self.limit:
+                self.stats["waited"] += 1
+                try:
+                    await asyncio.wait_for(
+                        condition.wait_for(lambda: self.reserved + nbytes <= self.limit), timeout
+                    )
+                except asyncio.TimeoutError:
+                    self.stats["rejected"] += 1
+                    raise WorkspaceQuotaError(f"Temp disk quota busy: {nbytes} bytes not available after {timeout:g}s")
+            self.reserved += nbytes
+            self.stats["reservations"] += 1
+            self.stats["peak_reserved"] = max(self.stats["peak_reserved"], self.reserved)
+
+    async def release(self, nbytes: int):
+        if nbytes <= 0:
+            return
+        condition = self._get_condition()
+        async with condition:
+            self.reserved = max(0, self.reserved - nbytes)
+            condition.notify_all()
+
+workspace_quota = ByteQuota(WORKSPACE_QUOTA_BYTES)
+
+# Directories of workspaces open in this process, never touched by the janitor
+_active_dirs: Set[str] = set()
+# Held with an exclusive flock by the process that owns the workspace, so janitors in other
+# processes (API workers, render workers) can tell a live workspace from an abandoned one
+LOCK_FILE = ".lock"
+_janitor_stats = {"runs": 0, "removed_files": 0, "removed_dirs": 0, "freed_bytes": 0, "last_run": None}
+
+class Workspace:
+    """
+    A per-request scratch directory, removed with everything in it on close
+
+    path(name) is on disk under WORKSPACE_DIR; path(name, fast=True) is under WORKSPACE_FAST_DIR
+    (e.g. tmpfs) when configured, for small intermediates such as subtitle and concat list files.
+    """
+
+    def __init__(self, prefix: str = ""):
+        self.name = f"{prefix}{uuid4().hex}"
+        self.dir = os.path.join(WORKSPACE_DIR, self.name)
+        self.fast_dir = os.path.join(WORKSPACE_FAST_DIR, self.name) if WORKSPACE_FAST_DIR else self.dir
+        self.reserved = 0
+        self.closed = False
+        self._lock_fd: Optional[int] = None
+
+    def open(self) -> "Workspace":
+        os.makedirs(self.dir, exist_ok=True)
+        if fcntl is not None:
+            self._lock_fd = os.open(os.path.join(self.dir, LOCK_FILE), os.O_CREAT | os.O_RDWR)
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        if self.fast_dir != self.dir:
+            try:
+                os.makedirs(self.fast_dir, exist_ok=True)
+            except OSError as e:
+                print(f"Fast workspace directory unavailable, using disk: {e}")
+                self.fast_dir = self.dir
+        _active_dirs.update({self.dir, self.fast_dir})
+        return self
+
+    def path(self, filename: str, fast: bool = False) -> str:
+        """Path for a new file inside the workspace; only the base name of `filename` is used"""
+        return os.path.join(self.fast_dir if fast else self.dir, os.path.basename(filename))
+
+    def new_path(self, suffix: str, fast: bool = False) -> str:
+        """Unique path inside the workspace ending in `suffix` (e.g. ".mp4")"""
+        return self.path(f"{uuid4().hex}{suffix}", fast)
+
+    async def reserve(self, nbytes: int):
+        """Reserve quota for files this workspace is about to write, waiting while the quota is full"""
+        nbytes = max(0, int(nbytes))
+        await workspace_quota.acquire(nbytes)
+        self.reserved += nbytes
+
+    def usage(self) -> int:
+        """Bytes currently on disk in the workspace"""
+        return sum(_tree_size(d) for d in {self.dir, self.fast_dir})
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for directory in {self.dir, self.fast_dir}:
+            _active_dirs.discard(directory)
+            await asyncio.to_thread(shutil.rmtree, directory, True)
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        await workspace_quota.release(self.reserved)
+        self.reserved = 0
+
+async def open_workspace(prefix: str = "", reserve_bytes: int = 0) -> Workspace:
+    """
+    Open a workspace the caller closes itself, e.g. from a response BackgroundTask
+    once a file inside it has been sent
+    """
+    workspace = Workspace(prefix).open()
+    try:
+        await workspace.reserve(reserve_bytes)
+    except BaseException:
+        await workspace.close()
+        raise
+    return workspace
+
+@asynccontextmanager
+async def temp_workspace(prefix: str = "", reserve_bytes: int = 0):
+    """Scoped workspace, removed on exit"""
+    workspace = await open_workspace(prefix, reserve_bytes)
+    try:
+        yield workspace
+    finally:
+        await workspace.close()
+
+def temp_path(suffix: str, workspace: Optional[Workspace] = None, fast: bool = False) -> str:
+    """Unique temp file path, inside `workspace` when given, else loose in TEMP_DIR"""
+    if workspace is not None:
+        return workspace.new_path(suffix, fast)
+    return os.path.join(TEMP_DIR, f"{uuid4()}{suffix}")
+
+def _tree_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def _is_locked(workspace_name: str) -> bool:
+    """Whether a live process, this one included, holds the workspace's lock"""
+    if fcntl is None:
+        return False
+    try:
+        fd = os.open(os.path.join(WORKSPACE_DIR, workspace_name, LOCK_FILE), os.O_RDWR)
+    except OSError:
+        return False
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        # Closing also drops the lock if we just took it
+        os.close(fd)
+    return False
+
+@asynccontextmanager
+async def quota_reservation(nbytes: int):
+    """Hold `nbytes` of the quota for a block, e.g. while a request body is spooled to disk"""
+    nbytes = max(0, int(nbytes))
+    await workspace_quota.acquire(nbytes)
+    try:
+        yield
+    finally:
+        await workspace_quota.release(nbytes)
+
+def _remove_entry(path: str) -> int:
+    """Delete a file or directory and return the bytes freed"""
+    if os.path.isdir(path) and not os.path.islink(path):
+        size = _tree_size(path)
+        shutil.rmtree(path, ignore_errors=True)
+        _janitor_stats["removed_dirs"] += 1
+    else:
+        size = os.path.getsize(path)
+        os.remove(path)
+        _janitor_stats["removed_files"] += 1
+    return size
+
+def clean_stale_temp_files(max_age: float = WORKSPACE_MAX_AGE_SECONDS) -> Dict:
+    """
+    Delete workspaces and loose temp files not modified for `max_age` seconds
+
+    Left behind by crashed workers or requests that never reached their cleanup. Workspaces
+    whose lock is held by a live process are skipped whatever their age. The image and TTS caches
+    evict themselves and render job directories belong to the job queue, so they are skipped too.
+    """
+    protected = {os.path.abspath(d) for d in (IMAGE_CACHE_DIR, TTS_CACHE_DIR, RENDER_JOB_DIR, WORKSPACE_DIR)}
+    if WORKSPACE_FAST_DIR:
+        protected.add(os.path.abspath(WORKSPACE_FAST_DIR))
+    active = {os.path.abspath(d) for d in _active_dirs}
+    cutoff = time.time() - max_age
+    freed = 0
+
+    def sweep(directory: str, include_dirs: bool):
+        nonlocal freed
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            path = os.path.abspath(entry.path)
+            if path in protected or path in active:
+                continue
+            if entry.is_dir(follow_symlinks=False) and (not include_dirs or _is_locked(entry.name)):
+                continue
+            try:
+                if entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                    freed += _remove_entry(path)
+            except OSError as e:
+                print(f"Janitor could not remove {path}: {e}")
+
+    # Workspaces are whole directories; TEMP_DIR itself only holds loose files from older code paths
+    sweep(WORKSPACE_DIR, include_dirs=True)
+    if WORKSPACE_FAST_DIR:
+        sweep(WORKSPACE_FAST_DIR, include_dirs=True)
+    sweep(TEMP_DIR, include_dirs=False)
+
+    _janitor_stats["runs"] += 1
+    _janitor_stats["freed_bytes"] += freed
+    _janitor_stats["last_run"] = time.time()
+    return {"freed_bytes": freed}
+
+async def run_workspace_janitor(interval: float = WORKSPACE_JANITOR_INTERVAL_SECONDS,
+                                max_age: float = WORKSPACE_MAX_AGE_SECONDS):
+    """Sweep stale temp files every `interval` seconds until cancelled"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(clean_stale_temp_files, max_age)
+        except Exception as e:
+            print(f"Temp file janitor failed: {e}")
+
+def get_workspace_stats() -> Dict:
+    """Quota usage, open workspaces and janitor counters for this process"""
+    return {
+        "quota_bytes": workspace_quota.limit,
+        "reserved_bytes": workspace_quota.reserved,
+        "open_workspaces": len({d for d in _active_dirs if d.startswith(WORKSPACE_DIR)}),
+        "fast_dir": WORKSPACE_FAST_DIR,
+        **workspace_quota.stats,
+        "janitor": dict(_janitor_stats)
+    }
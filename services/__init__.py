@@ -1,8 +1,21 @@
+from .Media.provider_clients import *
+from .Media.single_flight import *
 from .Media.text_generation import *
+from .Media.text_cache import *
 from .Media.text_to_speech import *
 from .Media.text_to_image import *
+from .Media.image_cache import *
+from .Media.image_batch import *
+from .Media.subtitles import *
 from .Media.speech_to_text import *
+from .Media.ffmpeg_runner import *
+from .Media.workspace import *
+from .Media.upload_ingest import *
+from .Media.cloud_upload import *
+from .Media.media_stats import *
 from .Media.media_utils import *
+from .Media.render_jobs import *
+from .Media.direct_upload import *
 from .Auth.Auth import *
 from .Auth.GoogleAuth import *
 from .Auth.FacebookAuth import *
\ No newline at end of file
@@ -0,0 +1,62 @@
+# Benchmark the two-pass subtitled render (create_video + add_subtitles) against the single-pass graph
+# Requires ffmpeg on PATH. Run from the project root: python test/bench_render.py [seconds]
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Make the project root importable when run as a script (test/ is not a package)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.Media.media_utils import create_video_async, add_subtitles_async, create_video_with_subtitles_async
+from services.Media.subtitles import write_subtitles
+
+def make_inputs(directory, seconds):
+    image = os.path.join(directory, "image.png")
+    audio = os.path.join(directory, "audio.wav")
+    srt = os.path.join(directory, "subs.srt")
+    subprocess.run(["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "color=c=navy:s=1280x720",
+                    "-frames:v", "1", "-y", image], check=True)
+    subprocess.run(["ffmpeg", "-v", "error", "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+                    "-y", audio], check=True)
+    words = [{"word": f"word{i}", "start": i * 0.4, "end": i * 0.4 + 0.3} for i in range(int(seconds / 0.4))]
+    write_subtitles(words, srt)
+    return image, audio, srt
+
+def child_cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+async def two_pass(directory, image, audio, srt):
+    video = os.path.join(directory, "two_pass_video.mp4")
+    output = os.path.join(directory, "two_pass_subtitled.mp4")
+    await create_video_async(image, audio, video)
+    await add_subtitles_async(video, srt, output)
+    # The intermediate video is extra temp disk written and read back
+    return output, os.path.getsize(video) + os.path.getsize(output)
+
+async def single_pass(directory, image, audio, srt):
+    output = os.path.join(directory, "single_pass.mp4")
+    await create_video_with_subtitles_async(image, audio, srt, output)
+    return output, os.path.getsize(output)
+
+async def measure(label, fn, *args):
+    cpu_before = child_cpu_seconds()
+    start = time.perf_counter()
+    _, bytes_written = await fn(*args)
+    wall = time.perf_counter() - start
+    cpu = child_cpu_seconds() - cpu_before
+    print(f"{label:<12} wall {wall:7.2f} s  ffmpeg cpu {cpu:7.2f} s  temp written {bytes_written / 1024 / 1024:7.2f} MiB")
+
+async def main(seconds):
+    with tempfile.TemporaryDirectory() as directory:
+        image, audio, srt = make_inputs(directory, seconds)
+        print(f"{seconds}s of audio, 1280x720 image")
+        await measure("two-pass", two_pass, directory, image, audio, srt)
+        await measure("single-pass", single_pass, directory, image, audio, srt)
+
+if __name__ == "__main__":
+    asyncio.run(main(float(sys.argv[1]) if len(sys.argv) > 1 else 120))
@@ -0,0 +1,72 @@
+# Benchmark the streaming subtitle writer against the old string-concatenating convert_to_srt
+# Run from the project root: python test/bench_subtitles.py [word_count]
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Make the project root importable when run as a script (test/ is not a package)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.Media.subtitles import write_subtitles
+
+# Timings are the best of this many runs
+REPEATS = 5
+
+def make_words(count, seed=0):
+    rng = random.Random(seed)
+    vocabulary = ["the", "video", "generation", "pipeline", "renders", "subtitles", "quickly", "today", "again"]
+    words = []
+    t = 0.0
+    for i in range(count):
+        t += rng.uniform(0.05, 0.9 if i % 25 == 0 else 0.15)
+        duration = rng.uniform(0.15, 0.45)
+        word = rng.choice(vocabulary) + ("." if i % 17 == 16 else "")
+        words.append({"word": word, "start": t, "end": t + duration})
+        t += duration
+    return words
+
+def legacy_convert_to_srt(words, output_file):
+    """The previous implementation: fixed 5-word groups, built with repeated +="""
+    segments = [words[i:i + 5] for i in range(0, len(words), 5)]
+
+    def format_time(seconds):
+        ms = int((seconds % 1) * 1000)
+        s = int(seconds) % 60
+        m = int(seconds / 60) % 60
+        h = int(seconds / 3600)
+        return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+    srt_content = ""
+    for i, segment in enumerate(segments, 1):
+        text = " ".join(item['word'] for item in segment)
+        srt_content += f"{i}\n{format_time(segment[0]['start'])} --> {format_time(segment[-1]['end'])}\n{text}\n\n"
+    with open(output_file, "w") as f:
+        f.write(srt_content)
+
+def timed(label, fn, words, output_file, *args):
+    elapsed = cpu = float("inf")
+    for _ in range(REPEATS):
+        start, cpu_start = time.perf_counter(), time.process_time()
+        fn(words, output_file, *args)
+        elapsed = min(elapsed, time.perf_counter() - start)
+        cpu = min(cpu, time.process_time() - cpu_start)
+    # Second run under tracemalloc so allocation tracking does not skew the timing
+    tracemalloc.start()
+    fn(words, output_file, *args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<22} {elapsed * 1000:9.1f} ms wall  {cpu * 1000:9.1f} ms cpu  {os.path.getsize(output_file) / 1024:9.1f} KiB file"
+          f"  {peak / 1024:9.1f} KiB peak")
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    words = make_words(count)
+    print(f"{count} words")
+    with tempfile.TemporaryDirectory() as tmp:
+        timed("legacy convert_to_srt", legacy_convert_to_srt, words, os.path.join(tmp, "legacy.srt"))
+        for subtitle_format in ("srt", "vtt", "ass"):
+            timed(f"write_subtitles {subtitle_format}", write_subtitles, words,
+                  os.path.join(tmp, f"out.{subtitle_format}"), subtitle_format)